@@ -0,0 +1,46 @@
+"""Headless batch runner of main.py: runs a list of (env, controller, individual) jobs across a pool of
+processes, saves their trajectories and writes a results table.
+
+The jobs are read from a CSV file with the columns env, ctr, file_name and optionally result_file
+(--jobs, saved to the first free results/<env>/fastsim_<ctr>_<i>.npz by default), and/or are the
+individuals of directories of pickles (--individuals), run with the novelty controller and saved to
+results/individuals/<criteria>/FastSim/<individual>.npz, the layout read by results/compare/batch_error.py
+(see results/batch_jobs.py). E.g. all the FastSim trajectories of the selected individuals:
+
+    python fastsim/batch.py --individuals results/individuals/*/[sS]elected
+"""
+
+import os
+import sys
+import argparse
+import functools
+from main import SimEnv, controllers
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.normpath(f'{base_path}/../results'))
+import batch_jobs
+
+envs = ("kitchen", "maze_hard", "race_track")
+
+columns = ["env", "ctr", "file_name", "steps", "done", "x", "y", "distance_to_obj",
+           "wall_time", "result_file", "error"]
+
+
+def make_sim_env(job, frame_skip=1, max_steps=5000, save_csv=False):
+    """SimEnv of a job, without display nor printing."""
+    args = argparse.Namespace(env=job["env"], ctr=job["ctr"], file_name=job["file_name"],
+                              sleep_time=0., frame_skip=frame_skip, max_steps=max_steps,
+                              display=False, verbose=False, save_res=True, save_csv=save_csv)
+    return SimEnv(args, job["result_file"], quiet=True)
+
+
+if __name__ == "__main__":
+
+    parser = batch_jobs.argument_parser('Run fastsim simulations in batch, without display.', 5000,
+                                        'number of simulation steps of each run',
+                                        f'{base_path}/../results/fastsim_batch.csv')
+    args = parser.parse_args()
+    batch_jobs.run_batch(args, parser, "FastSim", columns,
+                         functools.partial(make_sim_env, frame_skip=args.frame_skip, max_steps=args.max_steps,
+                                           save_csv=args.save_csv),
+                         envs, controllers, SimEnv._result_file)
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Benchmark of the baseline controllers over a batch of robots: the vectorized controllers (get_commands)
+driving a VectorNavEnv from random start poses, against one get_command call per robot."""
+import time
+import argparse
+import numpy as np
+import gym
+import gym_fastsim
+from gym_fastsim.simple_nav.vector_env import VectorNavEnv
+from controllers.braitenberg import BraitenbergController
+from controllers.rulebased import RuleBasedController
+from benchmark_laser_table import envs, random_free_poses
+
+controllers = {"braitenberg": BraitenbergController, "rule": RuleBasedController}
+
+
+class _Observation:
+    """Stand-in env of a single robot for get_command."""
+
+    def __init__(self, laser_ranges):
+        self._laser_ranges = laser_ranges
+
+    def get_laserranges(self):
+        return self._laser_ranges
+
+
+def bench_controller(vec_env, poses, ctr, nbstep):
+    controller = controllers[ctr](None)
+    obs = vec_env.reset(poses)
+    t_ctr = 0.
+    t = time.time()
+    steps = 0
+    for _ in range(nbstep):
+        steps += 1
+        t_c = time.time()
+        actions = controller.get_commands(obs)
+        t_ctr += time.time() - t_c
+        obs, reward, done, info = vec_env.step(actions)
+        if done.all():
+            break
+    t_total = time.time() - t
+
+    # the same observations, one get_command call per robot
+    singles = [controllers[ctr](_Observation(list(o))) for o in obs]
+    t = time.time()
+    for c in singles:
+        c.get_command()
+    t_single = time.time() - t
+
+    print("%s: %d robots x %d steps in %.2f s (%.2f ms/step, controller %.3f ms/step, "
+          "%.1f ms/step with get_command per robot), %d robots reached the goal" %
+          (ctr, vec_env.n_robots, steps, t_total, 1000*t_total/steps, 1000*t_ctr/steps,
+           1000*t_single, done.sum()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark the vectorized baseline controllers over random start poses.')
+    parser.add_argument('--env', type=str, default="maze_hard",
+                        help='choose between kitchen, maze_hard and race_track')
+    parser.add_argument('--ctr', type=str, nargs='+', default=["braitenberg", "rule"],
+                        help='controllers: braitenberg, rule')
+    parser.add_argument('--n_robots', type=int, default=4096,
+                        help='number of robots, each from a random start pose')
+    parser.add_argument('--nbstep', type=int, default=1000,
+                        help='maximum number of steps, the run stops once all the robots reached the goal')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    spec = gym.spec(envs[args.env])
+    xml_env = spec._kwargs["xml_env"] if hasattr(spec, "_kwargs") else spec.kwargs["xml_env"]
+    vec_env = VectorNavEnv(xml_env, n_robots=args.n_robots)
+    poses = random_free_poses(vec_env, args.n_robots, rng)
+    for ctr in args.ctr:
+        bench_controller(vec_env, poses, ctr, args.nbstep)
@@ -0,0 +1,106 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Compare the exact laser raycast with the precomputed laser table (speed and error), and check that
+the error of the table is within its tolerance."""
+import os
+import time
+import argparse
+import numpy as np
+import gym
+import gym_fastsim
+from gym_fastsim.simple_nav.laser_table import LaserTable
+from gym_fastsim.simple_nav.vector_env import VectorNavEnv
+
+envs = {"kitchen": "kitchen-v1", "maze_hard": "maze-v0", "race_track": "race_track-v0"}
+
+
+def random_free_poses(vec_env, n, rng):
+    """n random poses of the map where the robot does not collide."""
+    size = vec_env.get_map_size()
+    poses = np.empty((0, 3))
+    while len(poses) < n:
+        p = np.stack([rng.uniform(0, size, n), rng.uniform(0, size, n), rng.uniform(-np.pi, np.pi, n)], axis=1)
+        collision, _ = vec_env._check_collision(p)
+        poses = np.concatenate([poses, p[~collision]])
+    return poses[:n]
+
+
+def bench_rays(xml_env, table, n_poses, repeat, rng):
+    vec_env = VectorNavEnv(xml_env)
+    poses = random_free_poses(vec_env, n_poses, rng)
+    angles = poses[:, 2:3] + vec_env.laser_angles[None, :]
+
+    t = time.time()
+    for _ in range(repeat):
+        exact = vec_env.map.raycast(poses[:, 0], poses[:, 1], angles, vec_env.laser_ranges)
+    t_raycast = (time.time() - t)/repeat
+    t = time.time()
+    for _ in range(repeat):
+        approx = table.ranges(poses[:, 0], poses[:, 1], angles, vec_env.laser_ranges)
+    t_table = (time.time() - t)/repeat
+
+    err = np.abs(exact - approx)
+    print("%d poses x %d lasers: raycast %.2f ms, table %.2f ms" %
+          (n_poses, angles.shape[1], 1000*t_raycast, 1000*t_table))
+    print("error: max %.4f, 99.9%% %.4f, mean %.5f (tolerance %.4f)" %
+          (err.max(), np.percentile(err, 99.9), err.mean(), table.tolerance))
+
+
+def check_bound(table, n_rays, rng):
+    """Largest error of the table against MazeMap.raycast over n_rays uniformly random rays of the map,
+    a RuntimeError being raised if it exceeds the tolerance."""
+    x = rng.uniform(0, table.map.real_w, n_rays)
+    y = rng.uniform(0, table.map.real_h, n_rays)
+    angles = rng.uniform(-np.pi, np.pi, (n_rays, 1))
+    err = np.abs(table.map.raycast(x, y, angles, table.max_range) - table.ranges(x, y, angles))
+    # the table is stored in float32
+    if err.max() > table.tolerance + 1e-6:
+        raise RuntimeError("Error of the laser table %.4f over its tolerance %.4f (%.3f%% of %d random rays)" %
+                           (err.max(), table.tolerance, 100*(err > table.tolerance).mean(), n_rays))
+    print("%d random rays: max error %.4f within the tolerance %.4f" % (n_rays, err.max(), table.tolerance))
+    return err.max()
+
+
+def bench_env(env_id, tolerance, nbstep, rng):
+    """SimpleNavEnv with random actions, with and without the table."""
+    actions = rng.uniform(-1, 1, (nbstep, 2))/117  # same scale as the evolved controllers
+    for laser_table in [None, tolerance]:
+        env = gym.make(env_id, laser_table=laser_table)
+        env.reset()
+        t = time.time()
+        for a in actions:
+            env.step(a)
+        print("SimpleNavEnv laser_table=%s: %.1f us/step" % (str(laser_table), 1e6*(time.time() - t)/nbstep))
+        env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark the precomputed laser table against the exact raycast.')
+    parser.add_argument('--env', type=str, default="maze_hard",
+                        help='choose between kitchen, maze_hard and race_track')
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='tolerance of the laser table')
+    parser.add_argument('--n_poses', type=int, default=1000,
+                        help='number of random poses for the raycast comparison')
+    parser.add_argument('--n_check', type=int, default=390000,
+                        help='number of random rays of the check of the tolerance, 0 to skip it')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='number of repetitions of the timings')
+    parser.add_argument('--nbstep', type=int, default=5000,
+                        help='number of steps of the SimpleNavEnv comparison, 0 to skip it')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    spec = gym.spec(envs[args.env])
+    xml_env = spec._kwargs["xml_env"] if hasattr(spec, "_kwargs") else spec.kwargs["xml_env"]
+
+    t = time.time()
+    table = LaserTable.from_xml(xml_env, tolerance=args.tolerance)
+    print("table built/loaded in %.1f s, %.1f%% of the cells raycast exactly" %
+          (time.time() - t, 100*np.asarray(table.exact).mean()))
+    if args.n_check > 0:
+        check_bound(table, args.n_check, rng)
+    bench_rays(xml_env, table, args.n_poses, args.repeat, rng)
+    if args.nbstep > 0:
+        bench_env(envs[args.env], args.tolerance, args.nbstep, rng)
@@ -1,5 +1,7 @@
 """The Braitenberg controller class."""
 
+import numpy as np
+
 
 class BraitenbergController:
     """It's a braitenberg controller, it adapts its speed according
@@ -11,6 +13,9 @@ class BraitenbergController:
         _reactivity: A float representing the reactivity of the robot.
         _speed: A float between 0 and 1 representing the speed of the robot.
         _laser_range: A float indicating the range of the lasers.
+
+    get_commands computes the same actions for N robots at once from their (N, rays) laser ranges, e.g.
+    the observations of a vectorized env (the env given to the controller is not used, it can be None).
     """
 
     def __init__(self, env, laser_range=1, speed=1/117, reactivity=0.8, verbose=False):
@@ -44,5 +49,25 @@ class BraitenbergController:
 
         return [left, right]
 
+    def get_commands(self, observations):
+        """Calculates the futur actions of N robots.
+
+        Args:
+            observations: (N, rays) array of laser ranges.
+        Returns:
+            (N, 2) array of the actions for the left and right wheels.
+        """
+        # no walls detected => 0
+        proximity = self._laser_range - np.asarray(observations, dtype=float)
+        n_rays = proximity.shape[1]//2  # number of lasers on the left and right
+
+        sr = proximity[:, :n_rays].sum(axis=1)
+        sl = proximity[:, n_rays:].sum(axis=1)
+
+        commands = np.empty((len(proximity), 2))
+        commands[:, 0] = self._speed*(1+self._reactivity*(sl-sr))
+        commands[:, 1] = self._speed*(1+self._reactivity*(sr-sl))
+        return commands
+
     def reset(self):
         pass
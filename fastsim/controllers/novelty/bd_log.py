@@ -0,0 +1,67 @@
+import os
+import numpy as np
+
+# 16 bytes header: magic, version, dimension of the behavior descriptors
+MAGIC = b"BDLOG"
+VERSION = 1
+header_dtype = np.dtype([("magic", "S5"), ("version", "<u1"),
+                        ("pad", "<u2"), ("dim", "<u4"), ("reserved", "<u4")])
+
+
+def record_dtype(dim):
+    """One record per evaluated individual: generation, index in the evaluated batch and float32 BD."""
+    return np.dtype([("gen", "<u4"), ("ind", "<u4"), ("bd", "<f4", (dim,))])
+
+
+class BDLog:
+    """Binary append-only log of the behavior descriptors of all the evaluated individuals.
+
+    Replaces the text bd-*.log files: the records of a generation are written at once and flushed at the
+    end of the generation, and the file can be read back as a memory-mapped array with read_bd_log.
+    """
+
+    def __init__(self, filename, dim=2):
+        self.dim = dim
+        self.dtype = record_dtype(dim)
+        self.f = open(filename, "wb")
+        header = np.zeros(1, dtype=header_dtype)
+        header[0] = (MAGIC, VERSION, 0, dim, 0)
+        self.f.write(header.tobytes())
+        self.f.flush()
+
+    def write_generation(self, gen, bds):
+        """Appends the BDs of the individuals evaluated at generation gen."""
+        records = np.zeros(len(bds), dtype=self.dtype)
+        records["gen"] = gen
+        records["ind"] = np.arange(len(bds))
+        if len(bds) > 0:
+            records["bd"] = np.asarray(bds, dtype=np.float32).reshape(-1, self.dim)
+        self.f.write(records.tobytes())
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_bd_log(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_bd_log(filename):
+    """Memory-mapped structured array of the records (fields gen, ind and bd) of a BDLog file."""
+    header = np.fromfile(filename, dtype=header_dtype, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise RuntimeError("Not a BD log file: %s" % filename)
+    dtype = record_dtype(int(header["dim"]))
+    # the records of a generation being written may be incomplete
+    n = (os.path.getsize(filename)-header_dtype.itemsize)//dtype.itemsize
+    if n == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r", offset=header_dtype.itemsize, shape=(n,))
@@ -0,0 +1,79 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+
+class EvalCache:
+    """LRU cache of evaluation results, so that clones, elites and re-evaluated individuals are not simulated again.
+
+    The key is a hash of the genotype bytes and of the evaluation settings (env id, nbstep, nn_size and any
+    other setting changing the result, e.g. the stagnation detection), the values are the evaluation results
+    (dist_obj, rpos, saved). At most maxsize results are kept, the least recently used ones are dropped first.
+
+    Attributes:
+        maxsize: int, maximal number of cached results.
+        hits: int, number of evaluations found in the cache.
+        misses: int, number of evaluations that had to be simulated.
+    """
+
+    def __init__(self, env_id, nbstep=5000, nn_size=[10, 2, 2, 10], maxsize=10000, **settings):
+        self._settings = repr((env_id, nbstep, list(nn_size), sorted(settings.items()))).encode()
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, genotype):
+        h = hashlib.sha1(np.asarray(genotype, dtype=np.float64).tobytes())
+        h.update(self._settings)
+        return h.digest()
+
+    def _get(self, key):
+        self._results.move_to_end(key)
+        return self._results[key]
+
+    def _put(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def evaluate(self, genotype, eval_func):
+        """Result of eval_func(genotype), from the cache if possible."""
+        k = self.key(genotype)
+        if k in self._results:
+            self.hits += 1
+            return self._get(k)
+        self.misses += 1
+        result = eval_func(genotype)
+        self._put(k, result)
+        return result
+
+    def wrap(self, evaluate_all):
+        """Wraps a population evaluation function so that only the genotypes missing from the cache are evaluated
+        (once, even if they appear several times)."""
+        def cached_evaluate_all(genotypes):
+            keys = [self.key(g) for g in genotypes]
+            results = [None]*len(keys)
+            to_eval = OrderedDict()
+            for i, (k, g) in enumerate(zip(keys, genotypes)):
+                if k in self._results:
+                    self.hits += 1
+                    results[i] = self._get(k)
+                elif k in to_eval:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    to_eval[k] = g
+            if to_eval:
+                new = dict(zip(to_eval.keys(), evaluate_all(list(to_eval.values()))))
+                for k, result in new.items():
+                    self._put(k, result)
+                for i, k in enumerate(keys):
+                    if results[i] is None:
+                        results[i] = new[k]
+            return results
+        return cached_evaluate_all
+
+    def stats(self):
+        return "cache: %d hits, %d misses, %d results" % (self.hits, self.misses, len(self._results))
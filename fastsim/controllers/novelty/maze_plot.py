@@ -3,10 +3,13 @@
 import matplotlib.pyplot as plt
 import sys
 import os
+import numpy as np
+from bd_log import is_bd_log, read_bd_log
 
 
 def plot_points(points, bg="maze_hard.pbm", title=None):
-    x, y = zip(*points)
+    points = np.asarray(points)
+    x, y = points[:, 0], points[:, 1]
     fig1, ax1 = plt.subplots()
     ax1.set_xlim(0, 10)
     ax1.set_ylim(10, 0)  # Decreasing
@@ -25,16 +28,15 @@ base_path = os.path.dirname(os.path.abspath(__file__))
 
 
 def plot_points_file(filename, bg=f"{base_path}/../../gym_fastsim/assets/maze_hard.pbm", title=None):
+    """Plots the BDs of a binary BD log (see bd_log.py) or of an old text bd-*.log file."""
     try:
-        with open(filename) as f:
-            points = []
-            for l in f.readlines():
-                pos = list(map(float, l.split(" ")))
-                points.append(pos)
-            f.close()
-            plot_points(points, bg, title)
+        if is_bd_log(filename):
+            points = read_bd_log(filename)["bd"]
+        else:
+            points = np.loadtxt(filename, ndmin=2)
+        plot_points(points, bg, title)
     except IOError:
-        print("Could not read file: "+f)
+        print("Could not read file: "+filename)
 
 
 if __name__ == '__main__':
@@ -1,37 +1,135 @@
-from scipy.spatial import KDTree, distance
+from scipy.spatial import distance
 import random
 import numpy as np
 
 
+class GridIndex:
+    """Bucketed spatial index of 2-D points: each square cell of side cell_size keeps the indices of its points.
+
+    Points are only appended, so adding a point is O(1) and the index is never rebuilt.
+    """
+    def __init__(self, cell_size):
+        self.cell_size=cell_size
+        self.cells={}
+        self.cmin=None
+        self.cmax=None
+
+    def add(self, points, first_index):
+        cells=np.floor(points/self.cell_size).astype(int)
+        for i,c in enumerate(map(tuple,cells)):
+            self.cells.setdefault(c,[]).append(first_index+i)
+        lo=cells.min(axis=0)
+        hi=cells.max(axis=0)
+        self.cmin=lo if self.cmin is None else np.minimum(self.cmin,lo)
+        self.cmax=hi if self.cmax is None else np.maximum(self.cmax,hi)
+
+    @staticmethod
+    def _ring(c, r):
+        if r==0:
+            return [tuple(c)]
+        i0,j0=c[0]-r,c[1]-r
+        i1,j1=c[0]+r,c[1]+r
+        return ([(i,j0) for i in range(i0,i1+1)]+[(i,j1) for i in range(i0,i1+1)]+
+                [(i0,j) for j in range(j0+1,j1)]+[(i1,j) for j in range(j0+1,j1)])
+
+    def knn_dist(self, points, all_points, k):
+        """Sorted distances of each of the points to its k nearest neighbors among all_points (inf padded)."""
+        out=np.full((len(points),k),np.inf)
+        n=len(all_points)
+        for q,p in enumerate(points):
+            c=np.floor(p/self.cell_size).astype(int)
+            # cells are visited by rings of increasing radius r: points out of the ring are at least r*cell_size away,
+            # starting from the first ring that meets the bounding box of the cells
+            r_min=int(max(np.maximum(self.cmin-c,0).max(),np.maximum(c-self.cmax,0).max()))
+            r_max=int(max(np.abs(c-self.cmin).max(),np.abs(c-self.cmax).max()))
+            cand=[]
+            for r in range(r_min,r_max+1):
+                for cell in self._ring(c,r):
+                    cand.extend(self.cells.get(cell,[]))
+                if len(cand)>=min(k,n):
+                    d=np.sort(np.linalg.norm(all_points[cand]-p,axis=1))[:k]
+                    if len(cand)==n or d[-1]<=r*self.cell_size:
+                        break
+            else:
+                d=np.sort(np.linalg.norm(all_points[cand]-p,axis=1))[:k]
+            out[q,:len(d)]=d
+        return out
+
+
 class NovArchive:
-    """Archive used to compute novelty scores."""
-    def __init__(self, lbd, k=15):
-        self.all_bd=lbd
-        self.kdtree=KDTree(self.all_bd)
+    """Archive used to compute novelty scores.
+
+    The behavior descriptors are stored in a preallocated NumPy array whose capacity is doubled when full.
+    2-D descriptors (e.g. final positions) are also indexed by a GridIndex, whose cell size is adapted to the
+    spread of the archive each time the capacity is doubled. It is queried once the archive holds grid_min_size
+    descriptors, below that (and for other dimensions) a brute force search is faster.
+    """
+    def __init__(self, lbd, k=15, capacity=1024, grid_min_size=4096):
+        lbd=np.asarray(lbd,dtype=float)
         self.k=k
+        self.grid_min_size=grid_min_size
+        self._bd=np.empty((max(capacity,len(lbd)),lbd.shape[1]))
+        self._size=0
+        self.index=None
+        self.update(lbd)
         #print("Archive constructor. size = %d"%(len(self.all_bd)))
-        
+
+    @property
+    def all_bd(self):
+        return self._bd[:self._size]
+
+    def _reindex(self):
+        # about 2 points per cell on average, cells of the same size in both directions
+        extent=np.ptp(self.all_bd,axis=0).max()
+        self.index=GridIndex((extent if extent>0 else 1.)/max(np.sqrt(self._size/2.),1.))
+        self.index.add(self.all_bd,0)
+
     def update(self,new_bd):
-        oldsize=len(self.all_bd)
-        self.all_bd=self.all_bd + new_bd
-        self.kdtree=KDTree(self.all_bd)
+        new_bd=np.asarray(new_bd,dtype=float).reshape(-1,self._bd.shape[1])
+        oldsize=self._size
+        grown=oldsize+len(new_bd)>len(self._bd)
+        if grown:
+            bd=np.empty((max(2*len(self._bd),oldsize+len(new_bd)),self._bd.shape[1]))
+            bd[:oldsize]=self._bd[:oldsize]
+            self._bd=bd
+        self._bd[oldsize:oldsize+len(new_bd)]=new_bd
+        self._size+=len(new_bd)
+        if self._bd.shape[1]==2:
+            if grown or self.index is None:
+                self._reindex()
+            else:
+                self.index.add(new_bd,oldsize)
         #print("Archive updated, old size = %d, new size = %d"%(oldsize,len(self.all_bd)))
-        
-    def get_nov(self,bd, population=[]):
 
-        ## à faire: calcul de la nouveauté: somme de la distance dans l'espace comportemental aux k plus proches voisins parmi la population et l'archive des
-        ## individus déjà explorés. Le descripteur comportemental par rapport auquel calculer toutes les distances est bd. ind.bd permet de récupérer le
-        ## descripteur d'un individu ind de la population. Concernant l'archive, utilisez la fonction self.kdtree.query.
-        pop_bds = [ind.bd for ind in population]
-        pop_tree = KDTree(pop_bds)
-      
-        pop_dist = pop_tree.query(bd, self.k)[0]
-        archive_dist = self.kdtree.query(bd, self.k)[0]
-        
-        return np.sum(np.sort(np.append(pop_dist, archive_dist))[:self.k])
+    def knn_dist(self, bds):
+        """Sorted distances of each of the bds to its k nearest neighbors in the archive (inf padded)."""
+        bds=np.asarray(bds,dtype=float).reshape(-1,self._bd.shape[1])
+        if self.index is not None and self._size>=self.grid_min_size:
+            return self.index.knn_dist(bds,self.all_bd,self.k)
+        d=distance.cdist(bds,self.all_bd)
+        if d.shape[1]>self.k:
+            d=np.partition(d,self.k-1,axis=1)[:,:self.k]
+        d=np.sort(d,axis=1)
+        return np.pad(d,((0,0),(0,self.k-d.shape[1])),constant_values=np.inf)
+
+    def get_nov_batch(self, bds):
+        """Novelty of all the bds at once: sum of the distances to the k nearest neighbors among the archive and the bds themselves.
+
+        Same score as get_nov(bd, population) for each bd of the population, with one k-NN query for the whole generation.
+        """
+        bds=np.asarray(bds,dtype=float)
+        d=np.concatenate([self.knn_dist(bds),distance.cdist(bds,bds)],axis=1)
+        k=min(self.k,d.shape[1])
+        return np.partition(d,k-1,axis=1)[:,:k].sum(axis=1)
+
+    def get_nov(self,bd, population=[]):
+        # sum of the distances to the k nearest neighbors among the population and the archive
+        pop_bds=np.array([ind.bd for ind in population],dtype=float).reshape(-1,self._bd.shape[1])
+        d=np.concatenate([self.knn_dist([bd])[0],np.linalg.norm(pop_bds-np.asarray(bd,dtype=float),axis=1)])
+        return np.sum(np.sort(d)[:self.k])
 
     def size(self):
-        return len(self.all_bd)
+        return self._size
     
 def updateNovelty(population, offspring, archive, k=15, add_strategy="random", _lambda=6, verbose=False):
    """Update the novelty criterion (including archive update) 
@@ -51,8 +149,9 @@ def updateNovelty(population, offspring, archive, k=15, add_strategy="random", _
    if (archive) and (archive.size()>=k):
        if (verbose):
            print("Update Novelty. Archive size=%d"%(archive.size())) 
-       for ind in population:
-           ind.novelty=archive.get_nov(ind.bd, population)
+       novelties=archive.get_nov_batch([ind.bd for ind in population])
+       for ind,nov in zip(population,novelties):
+           ind.novelty=nov
    else:
        if (verbose):
            print("Update Novelty. Initial step...") 
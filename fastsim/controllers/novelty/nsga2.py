@@ -1,6 +1,6 @@
 from deap import *
 import numpy as np
-from fixed_structure_nn_numpy import SimpleNeuralControllerNumpy
+from fixed_structure_nn_numpy import SimpleNeuralControllerNumpy, PopulationNeuralControllerNumpy
 import cma
 import gym
 import gym_fastsim
@@ -23,14 +23,62 @@ import time
 from scoop import futures
 
 from novelty_search import *
+from pool_evaluator import PoolEvaluator
+from eval_cache import EvalCache
+from bd_log import BDLog
+
+# gym ids of the maps, with pyfastsim and with the pure NumPy backend (--vector); the 10 lasers
+# kitchen is used by both, the NN controller reading 10 laser ranges
+envs = {"kitchen": "kitchen-v1", "maze": "maze-v0", "race_track": "race_track-v0"}
+vector_envs = {"kitchen": "kitchen_vec-v1", "maze": "maze_vec-v0", "race_track": "race_track_vec-v0"}
+
+
+class StagnationDetector:
+    """Detects the robots that moved less than threshold over the last window steps.
+
+    Stopping them early saves the rest of their episode. A robot stuck against a wall keeps its final
+    position, and thus its fitness and behavior descriptor, but one that is slowly turning in place may
+    have escaped later: with stagnation detection, such robots get the fitness and BD of the position
+    where they stagnated. The detection is off by default (window=0).
+
+    Attributes:
+        window: int, number of steps of the sliding window.
+        threshold: float, minimal displacement over the window.
+        history: array (window, K, 2), ring buffer of the last positions of the K robots.
+    """
+
+    def __init__(self, window, threshold, n_robots=1):
+        self.window = window
+        self.threshold = threshold
+        self.history = np.zeros((window, n_robots, 2))
+        self.t = 0
+
+    def update(self, pos):
+        """Records the (K, 2) positions of the current step, returns the (K,) stagnation flags."""
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        i = self.t % self.window
+        if self.t >= self.window:
+            stagnated = np.linalg.norm(
+                pos-self.history[i], axis=1) < self.threshold
+        else:
+            stagnated = np.zeros(len(pos), dtype=bool)
+        self.history[i] = pos
+        self.t += 1
+        return stagnated
 
 
-def eval_nn(genotype, env, nbstep=5000, render=False, name="", nn_size=[10, 2, 2, 10]):
+def eval_nn(genotype, env, nbstep=5000, render=False, name="", nn_size=[10, 2, 2, 10], stagnation_window=0, stagnation_threshold=0.01):
+    """Evaluates a genotype, returns (dist_obj, rpos, saved), saved being the number of steps
+    skipped because the robot stagnated (see StagnationDetector, disabled if stagnation_window is 0)."""
     nn = SimpleNeuralControllerNumpy(*nn_size)
     nn.set_parameters(genotype)
     observation = env.reset()
     old_pos = None
     total_dist = 0
+    saved = 0
+    if stagnation_window > 0:
+        stagnation = StagnationDetector(
+            stagnation_window, stagnation_threshold)
 
     for t in range(nbstep):
         if render:
@@ -47,11 +95,96 @@ def eval_nn(genotype, env, nbstep=5000, render=False, name="", nn_size=[10, 2, 2
         if(done):
             print("X", end="", flush=True)
             break
+        if stagnation_window > 0 and stagnation.update(pos)[0]:
+            saved = nbstep-t-1
+            break
 
     dist_obj = info["dist_obj"]
     rpos = [round(x, 2) for x in pos]
 
-    return round(dist_obj, 2), rpos
+    return round(dist_obj, 2), rpos, saved
+
+
+def eval_population(genotypes, envs, nbstep=5000, nn_size=[10, 2, 2, 10], stagnation_window=0, stagnation_threshold=0.01):
+    """Evaluates the genotypes by chunks of len(envs), one env per genotype.
+
+    All the robots of a chunk are stepped in lockstep and their actions are computed
+    by a single batched forward pass of PopulationNeuralControllerNumpy.
+    Returns the same (dist_obj, rpos, saved) as eval_nn for each genotype.
+    """
+    results = []
+    for c in range(0, len(genotypes), len(envs)):
+        chunk = genotypes[c:c+len(envs)]
+        nn = PopulationNeuralControllerNumpy(*nn_size)
+        nn.set_parameters(chunk)
+        observations = np.array([env.reset() for env in envs[:len(chunk)]])
+        active = np.ones(len(chunk), dtype=bool)
+        infos = [None]*len(chunk)
+        saved = np.zeros(len(chunk), dtype=int)
+        if stagnation_window > 0:
+            stagnation = StagnationDetector(
+                stagnation_window, stagnation_threshold, len(chunk))
+
+        for t in range(nbstep):
+            actions = nn.predict(observations)/117
+            for i in np.flatnonzero(active):
+                observations[i], reward, done, infos[i] = envs[i].step(
+                    actions[i])
+                if(done):
+                    print("X", end="", flush=True)
+                    active[i] = False
+            if stagnation_window > 0:
+                stagnated = active & stagnation.update(
+                    [info["robot_pos"][:2] for info in infos])
+                saved[stagnated] = nbstep-t-1
+                active &= ~stagnated
+            if not active.any():
+                break
+
+        for info, s in zip(infos, saved):
+            rpos = [round(x, 2) for x in info["robot_pos"][:2]]
+            results.append((round(info["dist_obj"], 2), rpos, int(s)))
+
+    return results
+
+
+def eval_vector(genotypes, vec_env, nbstep=5000, nn_size=[10, 2, 2, 10], stagnation_window=0, stagnation_threshold=0.01):
+    """Evaluates the genotypes by chunks of vec_env.n_robots in a VectorNavEnv (pure NumPy backend).
+
+    The last chunk is padded with copies of its last genotype, stagnating robots are stopped by zeroing their actions.
+    Returns the same (dist_obj, rpos, saved) as eval_nn for each genotype.
+    """
+    results = []
+    for c in range(0, len(genotypes), vec_env.n_robots):
+        chunk = list(genotypes[c:c+vec_env.n_robots])
+        n = len(chunk)
+        chunk += [chunk[-1]]*(vec_env.n_robots-n)
+        nn = PopulationNeuralControllerNumpy(*nn_size)
+        nn.set_parameters(chunk)
+        observations = vec_env.reset()
+        active = np.ones(vec_env.n_robots, dtype=bool)
+        saved = np.zeros(vec_env.n_robots, dtype=int)
+        if stagnation_window > 0:
+            stagnation = StagnationDetector(
+                stagnation_window, stagnation_threshold, vec_env.n_robots)
+
+        for t in range(nbstep):
+            observations, rewards, dones, info = vec_env.step(
+                nn.predict(observations)/117*active[:, None])
+            if stagnation_window > 0:
+                stagnated = active & ~dones & stagnation.update(
+                    info["robot_pos"][:, :2])
+                saved[stagnated] = nbstep-t-1
+                active &= ~stagnated
+            if (dones[:n] | ~active[:n]).all():
+                break
+        print("X"*int(dones[:n].sum()), end="", flush=True)
+
+        for dist_obj, pos, s in zip(info["dist_obj"][:n], info["robot_pos"][:n], saved[:n]):
+            results.append((round(float(dist_obj), 2),
+                            [round(float(x), 2) for x in pos[:2]], int(s)))
+
+    return results
 
 
 # Individual generator
@@ -80,7 +213,7 @@ creator.create("Individual", array.array, typecode="d",
 creator.create("Strategy", array.array, typecode="d")
 
 
-def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10], variant="NS"):
+def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10], variant="NS", lockstep_envs=None, vec_env=None, evaluator=None, stagnation_window=0, stagnation_threshold=0.01, cache=None):
     random.seed()
 
     nn = SimpleNeuralControllerNumpy(*nn_size)
@@ -117,7 +250,26 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
                      low=MIN_VALUE, up=MAX_VALUE, eta=20.0, indpb=1.0 / IND_SIZE)
     toolbox.decorate("mate", checkStrategy(MIN_STRATEGY))
     toolbox.decorate("mutate", checkStrategy(MIN_STRATEGY))
-    toolbox.register("evaluate", eval_nn, env=environment)
+    stagnation = dict(stagnation_window=stagnation_window,
+                      stagnation_threshold=stagnation_threshold)
+    toolbox.register("evaluate", eval_nn, env=environment,
+                     nn_size=nn_size, **stagnation)
+    if evaluator is not None:
+        toolbox.register("evaluate_all", evaluator)
+    elif vec_env is not None:
+        toolbox.register("evaluate_all", eval_vector,
+                         vec_env=vec_env, nn_size=nn_size, **stagnation)
+    elif lockstep_envs:
+        toolbox.register("evaluate_all", eval_population,
+                         envs=lockstep_envs, nn_size=nn_size, **stagnation)
+    else:
+        toolbox.register("evaluate_all", toolbox.map, toolbox.evaluate)
+    if cache is not None:
+        toolbox.register("evaluate_all", cache.wrap(toolbox.evaluate_all))
+        toolbox.register("evaluate_one", cache.evaluate,
+                         eval_func=toolbox.evaluate)
+    else:
+        toolbox.register("evaluate_one", toolbox.evaluate)
     toolbox.register("select", tools.selNSGA2)
 
     # création de la population
@@ -126,13 +278,14 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
     paretofront = tools.ParetoFront()
 
     # pour sauvegarder la position finale des politiques explorées
-    fbd = open(f"bd-{file_name}.log", "w")
+    fbd = BDLog(f"bd-{file_name}.bdlog")
 
     # Evaluate the individuals with an invalid fitness
     invalid_ind = [ind for ind in population if not ind.fitness.valid]
-    fitnesses_bds = toolbox.map(toolbox.evaluate, invalid_ind)
+    # a list, as toolbox.map returns a generator consumed by the loop below
+    fitnesses_bds = list(toolbox.evaluate_all(invalid_ind))
 
-    for ind, (fit, bd) in zip(invalid_ind, fitnesses_bds):
+    for ind, (fit, bd, saved) in zip(invalid_ind, fitnesses_bds):
         if (variant == "FIT+NS"):
             ind.fitness.values = (fit, 0)
         elif (variant == "FIT"):
@@ -141,8 +294,12 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
             ind.fitness.values = (0,)
         ind.fit = fit
         ind.bd = bd
-        fbd.write(" ".join(map(str, bd))+"\n")
-        fbd.flush()
+    fbd.write_generation(0, [ind.bd for ind in invalid_ind])
+
+    if stagnation_window > 0:
+        gen_saved = sum([r[2] for r in fitnesses_bds])
+        print(" gen 0: %d steps saved by stagnation detection (%.0f per evaluation)" % (
+            gen_saved, gen_saved/max(len(invalid_ind), 1)), flush=True)
 
     population = toolbox.select(population, len(population))
     if paretofront is not None:
@@ -170,6 +327,7 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
 
     # Begin the generational process
     for gen in range(1, ngen + 1):
+        gen_start = time.time()
         if (gen % 10 == 0):
             print(gen, end="", flush=True)
         else:
@@ -181,9 +339,12 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
 
         # Evaluate the individuals with an invalid fitness
         invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-        fitnesses_bds = toolbox.map(toolbox.evaluate, invalid_ind)
+        # timed here, as the evaluator is not called when all the genotypes are in the cache
+        eval_start = time.time()
+        fitnesses_bds = list(toolbox.evaluate_all(invalid_ind))
+        eval_time = time.time()-eval_start
 
-        for ind, (fit, bd) in zip(invalid_ind, fitnesses_bds):
+        for ind, (fit, bd, saved) in zip(invalid_ind, fitnesses_bds):
             if (variant == "FIT+NS"):
                 ind.fitness.values = (fit, 0)
             elif (variant == "FIT"):
@@ -192,8 +353,12 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
                 ind.fitness.values = (0,)
             ind.fit = fit
             ind.bd = bd
-            fbd.write(" ".join(map(str, bd))+"\n")
-            fbd.flush()
+        fbd.write_generation(gen, [ind.bd for ind in invalid_ind])
+
+        if stagnation_window > 0:
+            gen_saved = sum([r[2] for r in fitnesses_bds])
+            print(" gen %d: %d steps saved by stagnation detection (%.0f per evaluation)" % (
+                gen, gen_saved, gen_saved/max(len(invalid_ind), 1)), flush=True)
 
         pq = population+offspring
 
@@ -215,6 +380,12 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
         if paretofront is not None:
             paretofront.update(population)
 
+        if evaluator is not None:
+            print(" gen %d: %.2fs (evaluation %.2fs)" %
+                  (gen, time.time()-gen_start, eval_time), flush=True)
+        if cache is not None:
+            print(" gen %d: %s" % (gen, cache.stats()), flush=True)
+
         if (gen % 10 == 0):
             for i, p in enumerate(paretofront):
                 f = open(
@@ -229,15 +400,14 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
             valuemin = newvaluemin
             print("Gen "+str(gen)+", new min ! min fit=" +
                   str(valuemin)+" index="+str(indexmin))
-            dist_obj, rpos = eval_nn(pq[indexmin], environment,
-                                     render=False, name="gen%04d" % (gen))
+            dist_obj, rpos, _ = toolbox.evaluate_one(pq[indexmin])
             if valuemin < 0.2:
                 for i, p in enumerate(paretofront):
                     print("Visualizing indiv "+str(i) +
                           ", fit="+str(p.fitness.values))
                     f = open(
                         f"{base_path}/../../../results/individuals/{file_name}-gen{str(gen)}-p{str(i)}.pkl", "wb")
-                    eval_nn(p, env, name=str(i), render=False)
+                    toolbox.evaluate_one(p)
                     pickle.dump(p, f)
                 break
 
@@ -247,7 +417,7 @@ def launch_nsga2(environment, mu=100, lambda_=100, ngen=2, nn_size=[10, 2, 2, 10
                       ", fit="+str(p.fitness.values))
                 f = open(
                     f"{base_path}/../../../results/individuals/{file_name}-gen{str(gen)}-p{str(i)}.pkl", "wb")
-                eval_nn(p, env, name=str(i), render=False)
+                toolbox.evaluate_one(p)
                 pickle.dump(p, f)
     fbd.close()
 
@@ -274,10 +444,29 @@ if (__name__ == "__main__"):
                         help='number of hidden layers of the NN controller')
     parser.add_argument('--file_name', type=str,
                         default='maze_fit11', help='file name')
+    parser.add_argument('--lockstep', type=int, default=0,
+                        help='number of environments stepped in lockstep with a batched NN controller (0: one individual per map call)')
+    parser.add_argument('--vector', type=int, default=0,
+                        help='number of robots simulated at once by the pure NumPy backend (0: use pyfastsim)')
+    parser.add_argument('--stagnation_window', type=int, default=0,
+                        help='stop an evaluation when the robot moved less than stagnation_threshold over this number of steps (0: disabled)')
+    parser.add_argument('--stagnation_threshold', type=float, default=0.01,
+                        help='minimal displacement over the stagnation window')
+    parser.add_argument('--cache_size', type=int, default=10000,
+                        help='number of evaluation results kept in the LRU cache (0: no cache)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of persistent worker processes, each with its own environment (0: use scoop futures.map)')
 
     args = parser.parse_args()
-    env = args.env+'-v0'
+    if args.env not in envs:
+        raise RuntimeError("Unknown env '%s'" % args.env)
+    env = envs[args.env]
     print("env: ", env)
+    lockstep_envs = [gym.make(env) for _ in range(args.lockstep)]
+    vec_env = gym.make(vector_envs[args.env],
+                       n_robots=args.vector) if args.vector > 0 else None
+    evaluator = None
+    env_id = env
     env = gym.make(env)
     print("Number of generations: "+str(args.nb_gen))
     ngen = args.nb_gen
@@ -296,10 +485,19 @@ if (__name__ == "__main__"):
     start = time.time()
     nn_size = [10, 2, args.hidden_layers, args.neurons_per_layer]
     base_path = os.path.dirname(os.path.abspath(__file__))
+    if args.workers > 0:
+        print("Evaluation with %d worker processes" % args.workers)
+        evaluator = PoolEvaluator(eval_nn, env_id, args.workers, nn_size=nn_size,
+                                  stagnation_window=args.stagnation_window, stagnation_threshold=args.stagnation_threshold)
+    cache = None
+    if args.cache_size > 0:
+        cache = EvalCache(vector_envs[args.env] if args.vector > 0 else env_id, nn_size=nn_size, maxsize=args.cache_size,
+                          stagnation_window=args.stagnation_window, stagnation_threshold=args.stagnation_threshold)
 
     # pop, logbook, paretofront =
     launch_nsga2(env, mu=mu, lambda_=lambda_, ngen=ngen,
-                 variant=variant, nn_size=nn_size)
+                 variant=variant, nn_size=nn_size, lockstep_envs=lockstep_envs, vec_env=vec_env, evaluator=evaluator,
+                 stagnation_window=args.stagnation_window, stagnation_threshold=args.stagnation_threshold, cache=cache)
 
     # for i, p in enumerate(paretofront):
     #     print("Visualizing indiv "+str(i)+", fit="+str(p.fitness.values))
@@ -310,4 +508,10 @@ if (__name__ == "__main__"):
     # f.close()
 
     env.close()
+    for e in lockstep_envs:
+        e.close()
+    if vec_env is not None:
+        vec_env.close()
+    if evaluator is not None:
+        evaluator.close()
     print("\n time taken: ", time.time()-start)
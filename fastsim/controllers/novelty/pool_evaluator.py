@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+import numpy as np
+import gym
+import gym_fastsim
+
+
+# Environment of the worker process, created once by _init_worker and kept across generations
+_worker_env = None
+
+
+def _init_worker(env_id, env_kwargs):
+    global _worker_env
+    _worker_env = gym.make(env_id, **env_kwargs)
+
+
+def _eval_chunk(task):
+    """Evaluates a chunk of genotypes received as a flat float64 buffer in the worker's environment."""
+    eval_func, buf, n_params, eval_kwargs = task
+    genotypes = np.frombuffer(buf, dtype=np.float64).reshape(-1, n_params)
+    return [eval_func(g, _worker_env, **eval_kwargs) for g in genotypes]
+
+
+class PoolEvaluator:
+    """Evaluates populations with a persistent pool of worker processes.
+
+    Each worker builds its own gym environment once, so nothing but the genotypes (sent by chunks,
+    as flat float64 buffers) and the (dist_obj, rpos) results crosses the process boundary.
+    Replaces the scoop futures.map evaluation, without having to launch the script with python -m scoop.
+
+    Attributes:
+        n_workers: int, number of worker processes.
+        eval_times: list of floats, wall time of each call (none for the generations fully found in the cache).
+    """
+
+    def __init__(self, eval_func, env_id, n_workers, env_kwargs=None, **eval_kwargs):
+        """
+        :param eval_func: evaluation function called as eval_func(genotype, env, **eval_kwargs) in the workers,
+            must be picklable (defined at the top level of a module)
+        :param env_id: id of the environment made by each worker
+        :param n_workers: number of worker processes
+        :param env_kwargs: kwargs of gym.make
+        """
+        self.eval_func = eval_func
+        self.eval_kwargs = eval_kwargs
+        self.n_workers = n_workers
+        self.eval_times = []
+        self.pool = multiprocessing.Pool(
+            n_workers, initializer=_init_worker, initargs=(env_id, env_kwargs or {}))
+
+    def __call__(self, genotypes):
+        start = time.time()
+        if len(genotypes) == 0:
+            self.eval_times.append(0.)
+            return []
+        genotypes = np.asarray(genotypes, dtype=np.float64)
+        n_params = genotypes.shape[1]
+        tasks = [(self.eval_func, chunk.tobytes(), n_params, self.eval_kwargs)
+                 for chunk in np.array_split(genotypes, min(self.n_workers, len(genotypes)))]
+        results = [r for chunk in self.pool.map(_eval_chunk, tasks) for r in chunk]
+        self.eval_times.append(time.time()-start)
+        return results
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
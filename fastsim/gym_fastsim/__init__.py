@@ -20,5 +20,12 @@ try:
              kwargs={"xml_env": join(dirname(__file__), maze_env)})
     register(id='race_track-v0', entry_point='gym_fastsim.simple_nav:SimpleNavEnv',
              kwargs={"xml_env": join(dirname(__file__), race_track_env)})
+    # pure NumPy backend simulating n_robots at once, e.g. gym.make('maze_vec-v0', n_robots=100)
+    register(id='kitchen_vec-v1', entry_point='gym_fastsim.simple_nav:VectorNavEnv',
+             kwargs={"xml_env": join(dirname(__file__), kitchen_lasers_env)})
+    register(id='maze_vec-v0', entry_point='gym_fastsim.simple_nav:VectorNavEnv',
+             kwargs={"xml_env": join(dirname(__file__), maze_env)})
+    register(id='race_track_vec-v0', entry_point='gym_fastsim.simple_nav:VectorNavEnv',
+             kwargs={"xml_env": join(dirname(__file__), race_track_env)})
 except:
     pass
@@ -1 +1,2 @@
 from gym_fastsim.simple_nav.nav_env import SimpleNavEnv
+from gym_fastsim.simple_nav.vector_env import VectorNavEnv
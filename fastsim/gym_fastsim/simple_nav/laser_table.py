@@ -0,0 +1,188 @@
+"""Precomputed laser ranges of a static fastsim map.
+
+The distance to the first obstacle along a ray only depends on the ray origin and absolute angle,
+so it can be tabulated once per map on a regular (x, y, theta) grid and read back by trilinear
+interpolation instead of raycasting at every step. The table is cached to disk and memory-mapped.
+
+Every cell of the grid is checked at build time against the exact raycast at the midpoints of its
+edges and at its center: if the interpolation misses one of them by more than the tolerance, or if
+the rays of these samples do not all hit the same straight line of pixel borders (a wall edge or
+corner may be hidden between them), the cell is flagged and the rays falling into it are raycast
+exactly at lookup time. The tolerance is thus the bound of the interpolation error of the other
+cells (checked on random rays by benchmark_laser_table.py).
+"""
+
+import os
+import math
+import hashlib
+import logging
+import numpy as np
+
+from gym_fastsim.simple_nav.vector_env import MazeMap, load_settings
+
+logger = logging.getLogger(__name__)
+
+default_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "gym_fastsim")
+
+
+class LaserTable:
+    """Table of ray distances of a MazeMap, indexed by discretized (x, y, theta).
+
+    :param maze_map: the MazeMap to tabulate
+    :param max_range: maximal range of the lasers, longer distances are stored as max_range
+    :param tolerance: maximal error (real units) of the interpolated distances, the rays of the cells
+        exceeding it (or hitting several walls) are raycast exactly
+    :param xy_step: spacing of the grid nodes in x and y (real units)
+    :param n_theta: number of angles of the grid
+    :param cache_dir: where the tables are saved, None to keep them in memory
+    """
+
+    # part of the cache key, to be increased when the tables built change
+    version = 2
+
+    def __init__(self, maze_map, max_range, tolerance=0.02, xy_step=0.05, n_theta=360, cache_dir=default_cache_dir):
+        self.map = maze_map
+        self.max_range = float(max_range)
+        self.tolerance = tolerance
+        self.xy_step = xy_step
+        self.n_theta = n_theta
+        self.theta_step = 2*np.pi/n_theta
+        self.nx = int(math.ceil(maze_map.real_w/xy_step))
+        self.ny = int(math.ceil(maze_map.real_h/xy_step))
+
+        key = hashlib.sha1(maze_map.grid.tobytes() + repr(
+            (self.version, maze_map.fx, self.max_range, tolerance, xy_step, n_theta)).encode()).hexdigest()[:16]
+        if cache_dir is None:
+            self.dist, self.exact = self._build(np.empty, np.empty)
+        else:
+            path = os.path.join(cache_dir, "laser_table-%s" % key)
+            if not (os.path.exists(path + "-dist.npy") and os.path.exists(path + "-exact.npy")):
+                os.makedirs(cache_dir, exist_ok=True)
+                self._build_to_disk(path)
+            self.dist = np.load(path + "-dist.npy", mmap_mode="r")
+            self.exact = np.load(path + "-exact.npy", mmap_mode="r")
+
+    @classmethod
+    def from_xml(cls, xml_env, **kwargs):
+        """Table of the map and lasers described in a fastsim XML file."""
+        settings = load_settings(xml_env)
+        max_range = max([r for (a, r) in settings["lasers"]])
+        maze_map = MazeMap(settings["map"], settings["size"], reach=max(
+            max_range, settings["robot_diameter"]/2.))
+        return cls(maze_map, max_range, **kwargs)
+
+    def _build_to_disk(self, path):
+        # written under temporary names then renamed, so that concurrent processes never read a partial table
+        tmp = "%s-%d" % (path, os.getpid())
+
+        def open_memmap(suffix):
+            return lambda shape, dtype: np.lib.format.open_memmap(tmp + suffix, mode="w+", shape=shape, dtype=dtype)
+        dist, exact = self._build(open_memmap("-dist.npy"), open_memmap("-exact.npy"))
+        dist.flush()
+        exact.flush()
+        del dist, exact
+        os.replace(tmp + "-dist.npy", path + "-dist.npy")
+        os.replace(tmp + "-exact.npy", path + "-exact.npy")
+
+    def _raycast(self, x, ys, angles):
+        """Exact distances of the rays starting at (x, ys[j]) with the angles[j], and the line of pixel
+        borders each of them hits: 2*X for the vertical border x=X, 2*Y+1 for the horizontal border y=Y
+        (in pixels), -1 if nothing is hit."""
+        d = self.map.raycast(np.full(len(ys), x), ys, angles, self.max_range)
+        hx = (x + d*np.cos(angles))/self.map.fx
+        hy = (ys[:, None] + d*np.sin(angles))/self.map.fx
+        vertical = np.abs(hx - np.rint(hx)) < 1e-6
+        line = np.where(vertical, 2*np.rint(hx), 2*np.rint(hy) + 1).astype(np.int64)
+        return d, np.where(d < self.max_range, line, -1)
+
+    def _build(self, alloc_dist, alloc_exact):
+        logger.info("Building laser table of %d x %d x %d rays" % (self.nx+1, self.ny+1, self.n_theta))
+        dist = alloc_dist((self.nx+1, self.ny+1, self.n_theta), np.float32)
+        exact = alloc_exact((self.nx, self.ny, self.n_theta), np.bool_)
+        ys = np.arange(self.ny+1)*self.xy_step
+        angles = np.broadcast_to(-np.pi + np.arange(self.n_theta)*self.theta_step, (self.ny+1, self.n_theta))
+        mid_ys = ys[:-1] + self.xy_step/2
+        mid_angles = angles + self.theta_step/2
+
+        def next_angle(a):
+            return np.roll(a, -1, axis=-1)
+
+        # The interpolation is exact at the corners of a cell. It is compared with the raycast at the
+        # midpoints of the 12 edges (the mean of 2 corners) and at the center (the mean of the 8 corners)
+        # of the cell, and all these rays must hit the same straight line of pixel borders: the distance
+        # is then smooth in the cell, instead of jumping where the rays start hitting another wall (or
+        # the corner of a wall) between the samples. The other cells are raycast exactly.
+        def plane(i):
+            """Nodes of the x = i*xy_step plane, with, for each cell of the plane, the largest error of
+            the interpolation on its edges along y and theta, and the line hit by all its rays (-2 if
+            they do not all hit the same)."""
+            d, line = self._raycast(i*self.xy_step, ys, angles)
+            dist[i] = d
+            d = dist[i]  # the error of the stored values, rounded to float32
+            y_edges, y_line = self._raycast(i*self.xy_step, mid_ys, angles[:-1])
+            theta_edges, theta_line = self._raycast(i*self.xy_step, ys, mid_angles)
+            y_error = np.abs(y_edges - (d[:-1] + d[1:])/2)
+            theta_error = np.abs(theta_edges - (d + next_angle(d))/2)
+            error = np.maximum.reduce([y_error, next_angle(y_error), theta_error[:-1], theta_error[1:]])
+            cell_line = line[:-1]
+            same = ((line[1:] == cell_line) & (next_angle(line[:-1]) == cell_line) &
+                    (next_angle(line[1:]) == cell_line) & (y_line == cell_line) &
+                    (next_angle(y_line) == cell_line) & (theta_line[:-1] == cell_line) &
+                    (theta_line[1:] == cell_line))
+            return d, error, np.where(same, cell_line, -2)
+
+        d0, error0, line0 = plane(0)
+        for i in range(self.nx):
+            d1, error1, line1 = plane(i+1)
+            x_edges, x_line = self._raycast((i+0.5)*self.xy_step, ys, angles)
+            x_error = np.abs(x_edges - (d0 + d1)/2)
+            corners = (d0[:-1] + d0[1:] + d1[:-1] + d1[1:])/4
+            center, center_line = self._raycast((i+0.5)*self.xy_step, mid_ys, mid_angles[:-1])
+            error = np.maximum.reduce([error0, error1, x_error[:-1], x_error[1:], next_angle(x_error[:-1]),
+                                       next_angle(x_error[1:]), np.abs(center - (corners + next_angle(corners))/2)])
+            same = ((line0 != -2) & (line1 == line0) & (center_line == line0) &
+                    (x_line[:-1] == line0) & (x_line[1:] == line0) &
+                    (next_angle(x_line[:-1]) == line0) & (next_angle(x_line[1:]) == line0))
+            exact[i] = (error > self.tolerance) | ~same
+            d0, error0, line0 = d1, error1, line1
+        return dist, exact
+
+    def lookup(self, x, y, angles):
+        """Interpolated distances of the rays starting at (x, y) with the given absolute angles.
+
+        :param x, y: (K,) positions of the ray origins
+        :param angles: (K, L) absolute angles of the rays
+        Returns a (K, L) array, NaN for the rays that must be raycast exactly.
+        """
+        angles = np.asarray(angles)
+        fx = np.broadcast_to(np.clip(np.asarray(x)/self.xy_step, 0, self.nx - 1e-6)[:, None], angles.shape)
+        fy = np.broadcast_to(np.clip(np.asarray(y)/self.xy_step, 0, self.ny - 1e-6)[:, None], angles.shape)
+        fa = ((angles + np.pi) % (2*np.pi))/self.theta_step
+        ix = fx.astype(np.intp)
+        iy = fy.astype(np.intp)
+        ia = fa.astype(np.intp) % self.n_theta
+        tx = fx - ix
+        ty = fy - iy
+        ta = fa - np.floor(fa)
+        ia1 = (ia + 1) % self.n_theta
+
+        d = self.dist
+
+        def interp_a(i, j):
+            return d[i, j, ia]*(1 - ta) + d[i, j, ia1]*ta
+        value = ((interp_a(ix, iy)*(1 - ty) + interp_a(ix, iy+1)*ty)*(1 - tx) +
+                 (interp_a(ix+1, iy)*(1 - ty) + interp_a(ix+1, iy+1)*ty)*tx)
+        return np.where(self.exact[ix, iy, ia], np.nan, value)
+
+    def ranges(self, x, y, angles, max_range=None):
+        """Same as lookup, with the flagged rays raycast exactly in the map."""
+        x = np.asarray(x)
+        y = np.asarray(y)
+        angles = np.asarray(angles)
+        max_range = self.max_range if max_range is None else max_range
+        out = np.minimum(self.lookup(x, y, angles), max_range)
+        k, l = np.nonzero(np.isnan(out))
+        if k.size > 0:
+            out[k, l] = self.map.raycast(x[k], y[k], angles[k, l, None],
+                                         np.broadcast_to(max_range, angles.shape[1:])[l, None])[:, 0]
+        return out
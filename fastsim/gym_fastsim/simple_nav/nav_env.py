@@ -13,6 +13,8 @@ import logging
 
 import pyfastsim as fs
 
+from gym_fastsim.simple_nav.vector_env import load_settings
+
 logger = logging.getLogger(__name__)
 
 # default_env = "assets/LS_maze_hard.xml"
@@ -64,7 +66,18 @@ reward_functions = {"binary_goalbased": reward_binary_goal_based,
 
 
 class SimpleNavEnv(gym.Env):
-    def __init__(self, xml_env, reward_func="binary_goalbased", render=False, light_sensor_range=200., light_sensor_mode="realistic"):
+    """Single robot fastsim environment.
+
+    If laser_table is set (a tolerance, in real units), the laser ranges are read from a LaserTable
+    precomputed for the map and cached to disk instead of the ranges raycast by fastsim.
+
+    With frame_skip=k, each action is applied for k simulation steps: the rewards of the k steps are
+    summed, the episode stops at the first step reaching the goal and the sensors are read once, after the last step.
+    step(action, frames) applies an action for another number of steps, and info['frames'] is the number
+    of steps actually run.
+    """
+
+    def __init__(self, xml_env, reward_func="binary_goalbased", render=False, light_sensor_range=200., light_sensor_mode="realistic", laser_table=None, frame_skip=1):
         # Fastsim setup
         # XML files typically contain relative names (for map) wrt their own path. Make that work
         xml_dir, xml_file = os.path.split(xml_env)
@@ -84,6 +97,9 @@ class SimpleNavEnv(gym.Env):
             self.display = None
 
         self.maxVel = 4  # Same as in the C++ sferes2 experiment
+        if(frame_skip < 1):
+            raise RuntimeError("frame_skip must be at least 1, not %s" % str(frame_skip))
+        self.frame_skip = frame_skip
 
         # Lasers
         lasers = self.robot.get_lasers()
@@ -94,6 +110,13 @@ class SimpleNavEnv(gym.Env):
         else:
             self.maxSensorRange = 0.
 
+        if(laser_table is not None and n_lasers > 0):
+            from gym_fastsim.simple_nav.laser_table import LaserTable
+            self.laser_table = LaserTable.from_xml(xml_env, tolerance=laser_table)
+            self.laser_angles = np.array([a for (a, r) in load_settings(xml_env)["lasers"]])
+        else:
+            self.laser_table = None
+
         # Light sensors
         self.ls_mode = light_sensor_mode
         lightsensors = self.robot.get_light_sensors()
@@ -141,6 +164,8 @@ class SimpleNavEnv(gym.Env):
         return [pos.x(), pos.y(), pos.theta()]
 
     def get_laserranges(self):
+        if self.laser_table is not None:
+            return self._get_laserranges_from_table()
         out = list()
         for l in self.robot.get_lasers():
             # print("GET DIST :" + str(l.get_dist()))
@@ -155,6 +180,20 @@ class SimpleNavEnv(gym.Env):
                 out.append(np.clip(r, 0., self.maxSensorRange))
         return out
 
+    def _get_laserranges_from_table(self):
+        pos = self.robot.get_pos()
+        ranges = self.laser_table.lookup(np.array([pos.x()]), np.array([pos.y()]),
+                                         pos.theta() + self.laser_angles[None, :])[0]
+        out = list()
+        for l, r in zip(self.robot.get_lasers(), ranges):
+            if np.isnan(r):
+                # not accurate enough in this cell, use the range raycast by fastsim
+                r = l.get_dist()
+                if r < 0:
+                    r = self.maxSensorRange
+            out.append(np.clip(r, 0., self.maxSensorRange))
+        return out
+
     def get_lightsensors(self):
         out = list()
         for ls in self.robot.get_light_sensors():
@@ -183,33 +222,39 @@ class SimpleNavEnv(gym.Env):
         # return self.get_laserranges() + self.get_bumpers() + self.get_lightsensors()
         return self.get_laserranges()
 
-    def step(self, action):
+    def step(self, action, frames=None):
         # Action is: [leftWheelVel, rightWheelVel]
         [v1, v2] = action
+        frames = self.frame_skip if frames is None else frames
 
         self.v1_motor_order = np.clip(v1, -self.maxVel, self.maxVel)
         self.v2_motor_order = np.clip(v2, -self.maxVel, self.maxVel)
 
-        self.robot.move(self.v1_motor_order,
-                        self.v2_motor_order, self.map, sticky_walls)
+        reward = 0.
+        for frame in range(frames):
+            self.robot.move(self.v1_motor_order,
+                            self.v2_motor_order, self.map, sticky_walls)
 
-        sensors = self.get_all_sensors()
-        reward = self._get_reward()
+            reward += self._get_reward()
 
-        self.old_pos = self.current_pos
-        self.current_pos = self.get_robot_pos()
+            self.old_pos = self.current_pos
+            self.current_pos = self.get_robot_pos()
+
+            # if(sqdist(p,self.roldpos)<0.001**2):
+            #	self.still=self.still+1
+            # else:
+            #	self.still=0
+            # self.roldpos=p
+            #episode_over = self.still>=self.still_limit
 
-        # if(sqdist(p,self.roldpos)<0.001**2):
-        #	self.still=self.still+1
-        # else:
-        #	self.still=0
-        # self.roldpos=p
-        #episode_over = self.still>=self.still_limit
+            dist_obj = dist(self.current_pos, self.goalPos)
+            episode_over = dist_obj <= self.goal.get_diam()
+            if episode_over:
+                break
 
-        dist_obj = dist(self.current_pos, self.goalPos)
-        episode_over = dist_obj <= self.goal.get_diam()
+        sensors = self.get_all_sensors()
 
-        return sensors, reward, episode_over, {"dist_obj": dist_obj, "robot_pos": self.current_pos}
+        return sensors, reward, episode_over, {"dist_obj": dist_obj, "robot_pos": self.current_pos, "frames": frame + 1}
 
     def _get_reward(self):
         return self.reward_func(self)  # Use reward extraction function
@@ -0,0 +1,345 @@
+"""Pure NumPy implementation of the fastsim navigation task that simulates K robots at once.
+
+It loads the same XML/PBM assets as SimpleNavEnv but never crosses the pybind boundary:
+the K robots are moved with array-based differential-drive kinematics (same equations as
+libfastsim's Posture::move), the lasers are cast by sphere tracing in a precomputed distance
+field of the map and the bumpers come from a vectorized disc/obstacle overlap test.
+"""
+
+import os
+import math
+import xml.etree.ElementTree as ET
+import numpy as np
+import gym
+from gym import spaces
+from scipy.ndimage import distance_transform_edt
+
+
+def read_pbm(filename):
+    """Read a P1 (ascii) or P4 (binary) PBM file, returns a (h, w) bool array, True for obstacles."""
+    with open(filename, "rb") as f:
+        data = f.read()
+    tokens = []
+    i = 0
+    # magic number, width and height, skipping comments
+    while len(tokens) < 3:
+        while data[i:i+1].isspace():
+            i += 1
+        if data[i:i+1] == b"#":
+            while data[i:i+1] not in (b"\n", b""):
+                i += 1
+            continue
+        j = i
+        while not data[j:j+1].isspace():
+            j += 1
+        tokens.append(data[i:j])
+        i = j
+    magic, w, h = tokens[0], int(tokens[1]), int(tokens[2])
+    if magic == b"P4":
+        raw = np.frombuffer(data[i+1:], dtype=np.uint8)
+        row_bytes = (w + 7)//8
+        bits = np.unpackbits(raw[:row_bytes*h].reshape(h, row_bytes), axis=1)
+        return bits[:, :w].astype(bool)
+    elif magic == b"P1":
+        values = [c for c in data[i:] if c in b"01"]
+        return (np.array(values[:w*h], dtype=np.uint8) == ord("1")).reshape(h, w)
+    else:
+        raise RuntimeError("Unknown PBM format '%s' in %s" % (magic.decode(), filename))
+
+
+def load_settings(xml_env):
+    """Parse a fastsim XML file, returns a dictionary with the map, robot, goal and lasers settings."""
+    root = ET.parse(xml_env).getroot()
+    xml_dir = os.path.dirname(xml_env)
+    m = root.find("map")
+    r = root.find("robot")
+    g = root.find("goal")
+    return {
+        "map": os.path.join(xml_dir, m.get("name")),
+        "size": float(m.get("size")),
+        "robot_pos": [float(r.get("x")), float(r.get("y")), math.radians(float(r.get("theta", 0.)))],
+        "robot_diameter": float(r.get("diameter")),
+        "goal_pos": [float(g.get("x")), float(g.get("y"))],
+        "goal_diameter": float(g.get("diameter")),
+        "lasers": [(math.radians(float(l.get("angle"))), float(l.get("range"))) for l in root.findall("laser")],
+    }
+
+
+def normalize_angle(a):
+    return (a + np.pi) % (2*np.pi) - np.pi
+
+
+class MazeMap:
+    """Static map of the maze, with the distance field used for laser casting.
+
+    Coordinates follow libfastsim: x is the column, y is the row (pointing down), a pixel (i, j)
+    covers [i*fx, (i+1)*fx[ x [j*fx, (j+1)*fx[.
+    """
+
+    def __init__(self, pbm_file, real_w, reach=0.):
+        obstacles = read_pbm(pbm_file)
+        self.h, self.w = obstacles.shape
+        self.real_w = real_w
+        self.real_h = real_w*self.h/self.w
+        self.fx = real_w/self.w
+        # the map is surrounded by obstacles, wider than the reach of the rays and robots,
+        # so that they never index out of the grid
+        self.pad = int(math.ceil(reach/self.fx)) + 2
+        self.grid = np.pad(obstacles, self.pad, mode="constant", constant_values=True)
+        # distance (in pixels) from each pixel center to the nearest obstacle pixel center, 0 on obstacles
+        self.dist_field = distance_transform_edt(~self.grid)
+
+    def real_to_pixel(self, x):
+        return np.floor(np.asarray(x)/self.fx).astype(np.intp)
+
+    def raycast(self, x, y, angles, max_range):
+        """Distance to the first obstacle along each ray, max_range if nothing is hit.
+
+        :param x, y: (K,) positions of the ray origins
+        :param angles: (K, L) absolute angles of the rays
+        :param max_range: float or (L,) array, range of the rays
+        """
+        shape = np.shape(angles)
+        dx = np.cos(angles).ravel()
+        dy = np.sin(angles).ravel()
+        ox = np.broadcast_to((np.asarray(x)/self.fx)[:, None] + self.pad, shape).ravel()
+        oy = np.broadcast_to((np.asarray(y)/self.fx)[:, None] + self.pad, shape).ravel()
+        max_t = np.broadcast_to(np.asarray(max_range)/self.fx, shape).ravel()
+        field = self.dist_field.ravel()
+        width = self.dist_field.shape[1]
+        # axis-aligned rays never leave their pixel column/row
+        with np.errstate(divide="ignore"):
+            inv_dx = np.where(dx == 0, np.inf, 1./dx)
+            inv_dy = np.where(dy == 0, np.inf, 1./dy)
+        # a point on a pixel border belongs to the pixel the ray is entering: floor(p) going forward,
+        # ceil(p)-1 going backward, and the ray leaves the pixel through border cx+ex
+        sx = np.where(dx < 0, -1., 1.)
+        sy = np.where(dy < 0, -1., 1.)
+        ex = (dx >= 0).astype(float)
+        ey = (dy >= 0).astype(float)
+
+        t = np.zeros(dx.size)
+        while True:
+            cx = sx*np.floor(sx*(ox + t*dx)) + ex - 1
+            cy = sy*np.floor(sy*(oy + t*dy)) + ey - 1
+            d = field[(cy*width + cx).astype(np.intp)]
+            running = (d > 0) & (t <= max_t)
+            if not running.any():
+                break
+            # sphere tracing: a point inside a free pixel is at least d-sqrt(2) pixels away from any obstacle,
+            # and at least the current pixel is crossed so that no pixel is skipped near the walls
+            t_exit = np.minimum((cx + ex - ox)*inv_dx, (cy + ey - oy)*inv_dy)
+            t = np.where(running, np.maximum(t + d - math.sqrt(2), t_exit + 1e-9), t)
+
+        # exact entry distance of the ray into the obstacle pixel that was hit
+        with np.errstate(invalid="ignore"):
+            tx = np.where(dx != 0, (cx + 1 - ex - ox)*inv_dx, -np.inf)
+            ty = np.where(dy != 0, (cy + 1 - ey - oy)*inv_dy, -np.inf)
+        t_hit = np.clip(np.maximum(tx, ty), 0, t)
+        return np.where((d == 0) & (t_hit <= max_t), t_hit*self.fx, max_t*self.fx).reshape(shape)
+
+    def disc_offsets(self, radius):
+        """Pixel offsets covered by a disc of the given radius (real units), as in Robot::_check_collision."""
+        rp = int(round(radius/self.fx))
+        dy, dx = np.mgrid[-rp:rp+1, -rp:rp+1]
+        inside = dx**2 + dy**2 <= rp**2
+        return dx[inside], dy[inside]
+
+
+class VectorNavEnv(gym.Env):
+    """K robots navigating in the same fastsim maze, stepped with a single batched step(actions[K,2]).
+
+    Observations, rewards, dones and infos are arrays with a leading dimension K. Once a robot has
+    reached the goal it is frozen (its actions are ignored) until the next reset, so that a whole
+    population can be run until every robot is done.
+
+    If laser_table is set (a tolerance, in real units), the laser ranges are read from a LaserTable
+    precomputed for the map, the rays it is not accurate enough for being raycast exactly.
+
+    With frame_skip=k, each action is applied for k simulation steps (see SimpleNavEnv), the lasers
+    being cast once, after the last step.
+    """
+
+    def __init__(self, xml_env, n_robots=1, reward_func="binary_goalbased", render=False, laser_table=None, frame_skip=1):
+        settings = load_settings(xml_env)
+        self.n_robots = n_robots
+        self.maxVel = 4  # Same as in the C++ sferes2 experiment
+        if(frame_skip < 1):
+            raise RuntimeError("frame_skip must be at least 1, not %s" % str(frame_skip))
+        self.frame_skip = frame_skip
+
+        # Lasers
+        self.laser_angles = np.array([a for (a, r) in settings["lasers"]])
+        self.laser_ranges = np.array([r for (a, r) in settings["lasers"]])
+        n_lasers = len(self.laser_angles)
+        self.maxSensorRange = self.laser_ranges[0] if n_lasers > 0 else 0.
+
+        self.radius = settings["robot_diameter"]/2.
+        self.map = MazeMap(settings["map"], settings["size"],
+                           reach=max(self.maxSensorRange, self.radius))
+        self._disc_dx, self._disc_dy = self.map.disc_offsets(self.radius)
+        self._disc_angle = np.arctan2(self._disc_dy, self._disc_dx)
+        if(laser_table is not None and n_lasers > 0):
+            from gym_fastsim.simple_nav.laser_table import LaserTable
+            self.laser_table = LaserTable(self.map, self.laser_ranges.max(), tolerance=laser_table)
+        else:
+            self.laser_table = None
+
+        # State
+        self.initPos = np.array(settings["robot_pos"])
+        self.goalPos = np.array(settings["goal_pos"])
+        self.goalRadius = settings["goal_diameter"]/2.
+        self.goalDiameter = settings["goal_diameter"]
+        self.pos = np.tile(self.initPos, (n_robots, 1))
+        self.old_pos = self.pos.copy()
+        self.motor_orders = np.zeros((n_robots, 2))
+        self.bumpers = np.zeros((n_robots, 2))
+        self.done = np.zeros(n_robots, dtype=bool)
+        self.lasers = np.full((n_robots, n_lasers), self.maxSensorRange)
+
+        self.observation_space = spaces.Box(low=0., high=self.maxSensorRange,
+                                            shape=(n_robots, n_lasers), dtype=np.float32)
+        self.action_space = spaces.Box(low=-self.maxVel, high=self.maxVel,
+                                       shape=(n_robots, 2), dtype=np.float32)
+
+        # Reward
+        if(reward_func not in vector_reward_functions):
+            raise RuntimeError("Unknown reward '%s'" % str(reward_func))
+        else:
+            self.reward_func = vector_reward_functions[reward_func]
+
+    def get_robot_pos(self):
+        return self.pos.copy()
+
+    def get_laserranges(self):
+        return self.lasers
+
+    def get_bumpers(self):
+        return self.bumpers
+
+    def get_all_sensors(self):
+        return self.lasers.copy()
+
+    def _update_lasers(self):
+        if self.laser_table is not None:
+            self.lasers = self.laser_table.ranges(self.pos[:, 0], self.pos[:, 1],
+                                                  self.pos[:, 2:3] + self.laser_angles[None, :],
+                                                  self.laser_ranges)
+            return
+        self.lasers = self.map.raycast(self.pos[:, 0], self.pos[:, 1],
+                                       self.pos[:, 2:3] + self.laser_angles[None, :],
+                                       self.laser_ranges)
+
+    def _check_collision(self, pos):
+        """Returns the collision flags (K,) and the left/right bumpers (K, 2) of robots at pos."""
+        cx = self.map.real_to_pixel(pos[:, 0]) + self.map.pad
+        cy = self.map.real_to_pixel(pos[:, 1]) + self.map.pad
+        # outside of the map, the indices are clipped to the obstacle padding: moving there is a collision
+        h, w = self.map.grid.shape
+        occupied = self.map.grid[np.clip(cy[:, None] + self._disc_dy, 0, h - 1),
+                                 np.clip(cx[:, None] + self._disc_dx, 0, w - 1)]
+        a = normalize_angle(self._disc_angle[None, :] - pos[:, 2:3])
+        left = (occupied & (a > 0) & (a < np.pi/2)).any(axis=1)
+        right = (occupied & (a < 0) & (a > -np.pi/2)).any(axis=1)
+        return occupied.any(axis=1), np.stack([left, right], axis=1).astype(float)
+
+    def _move(self, d_l, d_r):
+        """Differential drive kinematics of libfastsim's Posture::move, for all the robots."""
+        x, y, theta = self.pos[:, 0], self.pos[:, 1], self.pos[:, 2]
+        w = 2*self.radius
+        alpha = (d_r - d_l)/w
+        turning = np.abs(alpha) > 1e-10
+        safe_alpha = np.where(turning, alpha, 1.)
+        r = d_l/safe_alpha + w/2
+        # displacement in the robot frame, rotated by theta - pi/2
+        mx = (np.cos(alpha) - 1)*r
+        my = np.sin(alpha)*r
+        rot = theta - np.pi/2
+        new_x = np.where(turning, x + np.cos(rot)*mx - np.sin(rot)*my, x + d_l*np.cos(theta))
+        new_y = np.where(turning, y + np.cos(rot)*my + np.sin(rot)*mx, y + d_l*np.sin(theta))
+        new_theta = normalize_angle(theta + alpha)
+        return np.stack([new_x, new_y, new_theta], axis=1)
+
+    def step(self, action):
+        # Action is: [[leftWheelVel, rightWheelVel]]*K
+        action = np.clip(np.asarray(action, dtype=np.float64).reshape(self.n_robots, 2),
+                         -self.maxVel, self.maxVel)
+
+        reward = np.zeros(self.n_robots)
+        # after the first frame, the robots that are done get no more reward, as the episode of SimpleNavEnv would stop
+        running = np.ones(self.n_robots, dtype=bool)
+        for _ in range(self.frame_skip):
+            self.motor_orders = np.where(self.done[:, None], 0., action)
+
+            new_pos = self._move(self.motor_orders[:, 0], self.motor_orders[:, 1])
+            collision, self.bumpers = self._check_collision(new_pos)
+            # on collision, the robot goes back to its previous position but keeps its new orientation
+            new_pos[collision, :2] = self.pos[collision, :2]
+            new_pos[self.done] = self.pos[self.done]
+
+            self.old_pos = self.pos
+            self.pos = new_pos
+
+            reward += np.where(running, self.reward_func(self), 0.)
+            dist_obj = np.hypot(self.pos[:, 0] - self.goalPos[0], self.pos[:, 1] - self.goalPos[1])
+            self.done = self.done | (dist_obj <= self.goalDiameter)
+            running = ~self.done
+            if self.done.all():
+                break
+        self._update_lasers()
+
+        return self.get_all_sensors(), reward, self.done.copy(), {"dist_obj": dist_obj, "robot_pos": self.get_robot_pos()}
+
+    def reset(self, poses=None):
+        """Puts the robots at their start poses: poses, a (n_robots, 3) array of x, y, theta, or the initial
+        pose of the map for all the robots if None."""
+        if poses is None:
+            self.pos = np.tile(self.initPos, (self.n_robots, 1))
+        else:
+            self.pos = np.array(poses, dtype=np.float64)
+            if self.pos.shape != (self.n_robots, 3):
+                raise RuntimeError("Expected (%d, 3) start poses, got an array of shape %s" %
+                                   (self.n_robots, str(self.pos.shape)))
+        self.old_pos = self.pos.copy()
+        self.motor_orders = np.zeros((self.n_robots, 2))
+        self.bumpers = np.zeros((self.n_robots, 2))
+        self.done = np.zeros(self.n_robots, dtype=bool)
+        self._update_lasers()
+        return self.get_all_sensors()
+
+    def render(self, mode='human', close=False):
+        pass
+
+    def close(self):
+        pass
+
+    def get_map_size(self):
+        return self.map.real_h
+
+
+def vector_reward_binary_goal_based(navenv):
+    """ Reward of 1 is given when close enough to the goal. """
+    d = np.hypot(navenv.pos[:, 0] - navenv.goalPos[0], navenv.pos[:, 1] - navenv.goalPos[1])
+    return (d <= navenv.goalRadius).astype(float)
+
+
+def vector_reward_minus_energy(navenv):
+    """ Reward = minus sum of absolute values of motor orders"""
+    return -np.abs(navenv.motor_orders).sum(axis=1)
+
+
+def vector_reward_displacement(navenv):
+    """ Reward = distance to previous position"""
+    return np.hypot(navenv.pos[:, 0] - navenv.old_pos[:, 0], navenv.pos[:, 1] - navenv.old_pos[:, 1])
+
+
+def vector_no_reward(navenv):
+    """ No reward"""
+    return np.zeros(navenv.n_robots)
+
+
+vector_reward_functions = {"binary_goalbased": vector_reward_binary_goal_based,
+                           "minimize_energy": vector_reward_minus_energy,
+                           "displacement": vector_reward_displacement,
+                           "none": vector_no_reward,
+                           None: vector_no_reward}
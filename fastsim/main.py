@@ -5,86 +5,127 @@ import gym_fastsim
 import time
 import os
 import sys
-import csv
 import argparse
 from controllers.follow_wall import FollowWallController
 from controllers.forward import ForwardController
 from controllers.rulebased import RuleBasedController
 from controllers.braitenberg import BraitenbergController
 from controllers.novelty_ctr import NoveltyController
+from recorder import TrajectoryRecorder, export_csv
+
+
+controllers = ("forward", "wall", "rule", "braitenberg", "novelty")
+
+
+def str2bool(value):
+    """Type of the boolean arguments: with type=bool, any non-empty string (even "False") is true."""
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise argparse.ArgumentTypeError("True or False expected, got '%s'" % value)
 
 
 class SimEnv():
     """This is the main class that runs the fastsim simulation daccording to the arguments.
 
     Attributes:
-        _env: The actual environnment.
+        _args: the arguments of the run (see the parser of main.py).
+        _env: The actual environnment, None once closed.
         _sleep_time: float, representing the sleep time between each step.
         _ctr: string, the name of the controller.
         _verbose: bool, activate verbose or not.
+        _quiet: bool, no printing at all (batch runs).
         _i: int, iterator for steps.
-        _liste_position: list of tuples, values to save in the csv file.
+        _recorder: TrajectoryRecorder streaming the steps to the result file, None if not saved.
     """
 
-    def __init__(self):
+    def __init__(self, args, result_file=None, quiet=False):
+        """
+        :param args: the arguments of the run (see the parser of main.py)
+        :param result_file: NPZ file of the trajectory if args.save_res, the first free one in results/<env> by default
+        :param quiet: no printing of the steps and of the results
+        """
+        self._args = args
+        self._quiet = quiet
         self._sleep_time = args.sleep_time
         self._verbose = args.verbose
         self._display = args.display
         self._ctr = args.ctr
         self._i = 0
-        self._Liste_position = []
+        self._env = None
+        self._recorder = None
 
         if args.env == "kitchen":
-            self._env = gym.make("kitchen-v1")
+            self._env = gym.make("kitchen-v1", frame_skip=args.frame_skip)
         elif args.env == "maze_hard":
-            self._env = gym.make("maze-v0")
+            self._env = gym.make("maze-v0", frame_skip=args.frame_skip)
         elif args.env == "race_track":
-            self._env = gym.make("race_track-v0")
-        self._env.reset()
-        self.map_size = self._env.get_map_size()
-        self.obs, self.rew, self.done, self.info = self._env.step([0, 0])
-
-        # initialize controllers
-        if self._ctr == "forward":
-            self._controller = ForwardController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "wall":
-            self._controller = FollowWallController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "rule":
-            self._controller = RuleBasedController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "braitenberg":
-            self._controller = BraitenbergController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "novelty":
-            self._controller = NoveltyController(
-                self._env, args.file_name, verbose=self._verbose)
-        else:
-            print("\nNo controller named", self._ctr)
-            sys.exit()
-
-        if(self._display):
-            self._env.enable_display()
+            self._env = gym.make("race_track-v0", frame_skip=args.frame_skip)
+        # the environment is closed if the controller or the result file cannot be loaded
+        try:
+            self._env.reset()
+            self.map_size = self._env.get_map_size()
+            self.obs, self.rew, self.done, self.info = self._env.step([0, 0])
+
+            # initialize controllers
+            if self._ctr == "forward":
+                self._controller = ForwardController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "wall":
+                self._controller = FollowWallController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "rule":
+                self._controller = RuleBasedController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "braitenberg":
+                self._controller = BraitenbergController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "novelty":
+                self._controller = NoveltyController(
+                    self._env, args.file_name, verbose=self._verbose)
+            else:
+                print("\nNo controller named", self._ctr)
+                sys.exit()
+
+            # created once the controller is loaded, so that no empty file is left if it fails
+            if args.save_res:
+                if result_file is None:
+                    result_file = self._result_file(args.env, args.ctr)
+                self._recorder = TrajectoryRecorder(
+                    result_file, ["x", "y", "roll", "distance_to_obj"], len(self.obs))
+
+            if(self._display):
+                self._env.enable_display()
+        except BaseException:
+            self.close()
+            raise
 
     def _movement(self, action, nbr=1):
         for _ in range(nbr):
-            obs, rew, done, info = self._env.step(action)
+            # the last action only runs the steps left before max_steps
+            frames = self._args.frame_skip
+            if self._args.max_steps > 0:
+                frames = min(frames, self._args.max_steps - self._i)
+            # unwrapped: the gym wrappers only pass the action
+            obs, rew, done, info = self._env.unwrapped.step(action, frames)
             #print("Valeur de obs :" + str(obs))
             #print("Valeur de rew :" + str(rew))
             #print("Valeur de done :" + str(done))
             #print("Valeur de info :" + str(info))
 
-            print(self._i, end='\r')
-            self._i += 1
+            if not self._quiet:
+                print(self._i, end='\r')
+            # simulation steps actually run, fewer than frames if the episode is done
+            self._i += info['frames']
 
             if(self._display):
                 time.sleep(self._sleep_time)
 
-            if args.save_res:
+            if self._recorder is not None:
                 x, y, theta = info['robot_pos']
-                self._Liste_position.append(
-                    [self._i, x, (self.map_size-y), theta, info["dist_obj"], obs])
+                self._recorder.record(
+                    self._i, (x, (self.map_size-y), theta, info["dist_obj"]), obs)
             if done:
                 break
             self._env.render()
@@ -93,40 +134,65 @@ class SimEnv():
 
     def start(self):
         """Forward the simulation until its complete."""
-        while not self.done and self._i < 5000:
-            try:
-                command = self._controller.get_command()
-                self.obs, self.rew, self.done, self.info = self._movement(
-                    command)
-                self._controller.reset()
-
-            except KeyboardInterrupt:
-                print(' The simulation was forcibly stopped.')
-                break
-
-        print("Number of steps:", self._i)
-        self._env.close()
+        try:
+            while not self.done and self._i < self._args.max_steps:
+                try:
+                    command = self._controller.get_command()
+                    self.obs, self.rew, self.done, self.info = self._movement(
+                        command)
+                    self._controller.reset()
+
+                except KeyboardInterrupt:
+                    print(' The simulation was forcibly stopped.')
+                    break
+        finally:
+            self.close()
+
+        if not self._quiet:
+            print("Number of steps:", self._i)
+
+    def close(self):
+        """Close the environment and write the steps recorded so far to the result file, at the end of
+        the run or after a failure (several calls are harmless)."""
+        if self._env is not None:
+            self._env.close()
+            self._env = None
+        if self._recorder is not None:
+            self._recorder.close()
+
+    def summary(self):
+        """Results of the run: number of steps, goal reached, last position and distance to the goal,
+        and trajectory file (None if not saved)."""
+        x, y, theta = self.info['robot_pos']
+        return {"steps": self._i, "done": bool(self.done), "x": x, "y": self.map_size-y,
+                "distance_to_obj": self.info["dist_obj"],
+                "result_file": self._recorder.filename if self._recorder is not None else None}
+
+    @staticmethod
+    def _result_file(env, ctr, taken=()):
+        """First free result file name in the folder corresponding to the controller, not in taken."""
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        path = f'{base_path}/../results/{env}/fastsim_{ctr}_'
+        i = 1
+        while os.path.exists(path+str(i)+".npz") or os.path.exists(path+str(i)+".csv") or path+str(i)+".npz" in taken:
+            i += 1
+        return path+str(i)+".npz"
 
     def save_result(self):
-        """Save the simulation data in a csv file in the folder
-        corresponding to the controller and name it accordingly.
+        """Write the last steps of the simulation in the result file (streamed during the run),
+        and export it as a csv file if asked.
         """
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        path = f'{base_path}/../results/{args.env}/fastsim_{args.ctr}_'
-        i = 1
-        if os.path.exists(path+str(i)+".csv"):
-            while os.path.exists(path+str(i)+".csv"):
-                i += 1
-        with open(path+str(i)+".csv", 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["steps", "x", "y", "roll",
-                             "distance_to_obj", "laser"])
-            writer.writerows(self._Liste_position)
-            print("\ndata saved in:", file.name)
+        self._recorder.close()
+        if not self._quiet:
+            print("\ndata saved in:", self._recorder.filename)
+        if self._args.save_csv:
+            csv_file = export_csv(self._recorder.filename)
+            if not self._quiet:
+                print("data exported in:", csv_file)
 
 
 def main():
-    sim_env = SimEnv()
+    sim_env = SimEnv(args)
     sim_env.start()
     if args.save_res:
         sim_env.save_result()
@@ -142,11 +208,17 @@ if __name__ == "__main__":
                         help='choose between wall, rule, braitenberg and novelty')
     parser.add_argument('--sleep_time', type=float, default=0.00,
                         help='sleeping time between each step')
-    parser.add_argument('--display', type=bool, default=True,
+    parser.add_argument('--frame_skip', type=int, default=1,
+                        help='number of simulation steps each command is applied for')
+    parser.add_argument('--max_steps', type=int, default=5000,
+                        help='number of simulation steps of the run')
+    parser.add_argument('--display', type=str2bool, default=True,
                         help='True or False')
-    parser.add_argument('--save_res', type=bool, default=True,
-                        help='save the result in a csv file: True or False')
-    parser.add_argument('--verbose', type=bool, default=False,
+    parser.add_argument('--save_res', type=str2bool, default=True,
+                        help='save the result in a npz file: True or False')
+    parser.add_argument('--save_csv', action='store_true',
+                        help='also export the result in the csv format of the previous versions')
+    parser.add_argument('--verbose', type=str2bool, default=False,
                         help='verbose for controller: True or False')
     parser.add_argument('--file_name', type=str,
                         default='NoveltyFitness/9/maze_nsfit9-gen38-p0', help='file name of the invidual to load if ctr=novelty')
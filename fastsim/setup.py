@@ -2,7 +2,7 @@ from setuptools import setup, find_packages
 
 setup(name='gym_fastsim',
       version='0.0.5',
-      install_requires=['gym>=0.11.0','pyfastsim'],
+      install_requires=['gym>=0.11.0','pyfastsim','numpy','scipy'],
       packages=find_packages(include=['gym_fastsim', 'gym_fastsim.*']),
       package_data={'gym_fastsim':['assets/*']},
       author='Alex Coninx',
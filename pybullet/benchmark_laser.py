@@ -0,0 +1,88 @@
+"""Micro-benchmark of the laser observation: per-observe latency of the previous implementation
+(object array conversion and fresh noise at every call) against the current Laser.observe,
+and, for several robots in the same physics client, of an observe per laser against a single
+observe_lasers call."""
+import os
+import time
+import argparse
+import numpy as np
+import pybullet as p
+from iRobot_gym.envs import SimpleNavScenario
+from iRobot_gym.envs.scenarios import load_vehicle
+from iRobot_gym.bullet.configs import ScenarioSpec
+from iRobot_gym.bullet.sensors import Laser, observe_lasers
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacy_observe(laser):
+    """Laser.observe before the preallocated buffers."""
+    results = p.rayTestBatch(laser._from, laser._to, 0,
+                             parentObjectUniqueId=laser.body_id,
+                             parentLinkIndex=laser.joint_index,
+                             physicsClientId=laser.client)
+    hit_fractions = np.array(results, dtype=object)[:, 2].astype(dtype=float)
+    ranges = laser._config.range * hit_fractions + laser._config.min_range
+    noise = np.random.uniform(
+        1.0 - laser._config.inaccuracy, 1.0 + laser._config.inaccuracy, size=ranges.shape)
+    return np.clip(ranges * noise, a_min=laser._config.min_range, a_max=laser._config.range)
+
+
+def timeit(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return 1e6*(time.perf_counter() - start)/repeat
+
+
+def main(args):
+    path = f'{base_path}/configuration/scenarios/{args.env}.yml'
+    scenario = SimpleNavScenario.from_spec(path)
+    spec = ScenarioSpec()
+    spec.load(path)
+    scenario.world.config.simulation_config.GUI = False
+    scenario.world.init()
+    client = scenario.world.client
+
+    # robots spread along the x axis of the maze, all in the same client
+    lasers = []
+    for i in range(args.robots):
+        vehicle = load_vehicle(spec.agents.vehicle)
+        vehicle.reset(((1 + i, 1, 0), (0, 0, 0)), client=client)
+        lasers.append(vehicle.sensors[0]._sensor)
+        # no debug line drawing, only the raycast is timed
+        lasers[-1]._config.visible = False
+    laser = lasers[0]
+    p.stepSimulation(physicsClientId=client)
+
+    for inaccuracy in [0., 0.05]:
+        laser._config.inaccuracy = inaccuracy
+        print("inaccuracy=%.2f" % inaccuracy)
+        print("  previous observe: %7.1f us" %
+              timeit(lambda: legacy_observe(laser), args.repeat))
+        for num_threads in [1, 0]:
+            laser._config.num_threads = num_threads
+            print("  observe (numThreads=%d): %7.1f us" %
+                  (num_threads, timeit(laser.observe, args.repeat)))
+
+    laser._config.inaccuracy = 0.
+    if len(lasers) > 1:
+        print("%d robots:" % len(lasers))
+        print("  observe each: %7.1f us" % timeit(
+            lambda: [l.observe() for l in lasers], args.repeat))
+        print("  observe_lasers: %7.1f us" % timeit(
+            lambda: observe_lasers(lasers), args.repeat))
+    scenario.world.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark the laser observation.')
+    parser.add_argument('--env', type=str, default="maze_hard",
+                        help='choose between kitchen, maze_hard and race_track')
+    parser.add_argument('--robots', type=int, default=8,
+                        help='number of robots of the batched observation')
+    parser.add_argument('--repeat', type=int, default=10000,
+                        help='number of observations timed')
+    main(parser.parse_args())
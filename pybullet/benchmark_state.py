@@ -0,0 +1,67 @@
+"""Micro-benchmark of the per-step overhead outside physics and raycast: World.state with the kinematic snapshot
+against the previous implementation (separate pose and velocity queries, numpy rotation, new arrays at each step),
+and the split of SimpleNavEnv.step between physics, raycast and the rest."""
+import os
+import math
+import time
+import argparse
+import numpy as np
+import pybullet as p
+from iRobot_gym.envs import make_env
+from iRobot_gym.bullet import util
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+
+
+def legacy_state(world):
+    """World.state before the kinematic snapshot."""
+    for agent in world._agents:
+        goal_pos = world.config.goal_config.goal_position
+        state = {}
+        pose = util.get_pose(id=agent.vehicle_id, client=world.client)
+        state['pose'] = pose
+        velocity = util.get_velocity(id=agent.vehicle_id, client=world.client)
+        state['acceleration'] = velocity / world.config.simulation_config.time_step
+        state['velocity'] = velocity
+        state['time'] = world._time
+        state['dist_obj'] = math.sqrt(
+            (pose[0]-goal_pos[0])**2+(pose[1]-goal_pos[1])**2)
+    return state
+
+
+def timeit(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return 1e6*(time.perf_counter() - start)/repeat
+
+
+def main(args):
+    env = make_env(f'{base_path}/configuration/scenarios/{args.env}.yml', headless=True)
+    env.reset()
+    world = env.scenario.world
+    laser = env.scenario.agent._vehicle.sensors[0]._sensor
+    for _ in range(100):
+        env.step([1, 0.5])
+
+    legacy = timeit(lambda: legacy_state(world), args.repeat)
+    snapshot = timeit(world.state, args.repeat)
+    print("World.state: previous %.1f us, snapshot %.1f us" % (legacy, snapshot))
+
+    step = timeit(lambda: env.step([1, 0.5]), args.repeat)
+    physics = timeit(lambda: p.stepSimulation(physicsClientId=world.client), args.repeat)
+    raycast = timeit(laser.observe, args.repeat)
+    print("SimpleNavEnv.step: %.1f us (physics %.1f us, raycast %.1f us, overhead %.1f us)" %
+          (step, physics, raycast, step - physics - raycast))
+    env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmark the per-step overhead of the pybullet env.')
+    parser.add_argument('--env', type=str, default="maze_hard",
+                        help='choose between kitchen, maze_hard and race_track')
+    parser.add_argument('--repeat', type=int, default=10000,
+                        help='number of calls timed')
+    main(parser.parse_args())
@@ -142,3 +142,82 @@ class SimpleNeuralControllerNumpy():
     def __call__(self, x):
         """Calling the controller calls predict"""
         return self.predict(x)
+
+
+class PopulationNeuralControllerNumpy():
+    """Population-level version of SimpleNeuralControllerNumpy.
+
+    The parameters of N genotypes sharing the same structure are stacked into
+    3-D weight tensors (N, n_in, n_out) and 2-D bias matrices (N, n_out), so
+    that the actions of N robots are computed with one batched einsum per layer.
+    """
+
+    def __init__(self, n_in, n_out, n_hidden_layers=2, n_neurons_per_hidden=5, params=None):
+        self.dim_in = n_in
+        self.dim_out = n_out
+        if (not params == None):
+            if ("n_hidden_layers" in params.keys()):
+                n_hidden_layers = params["n_hidden_layers"]
+            if ("n_neurons_per_hidden" in params.keys()):
+                n_neurons_per_hidden = params["n_neurons_per_hidden"]
+        self.n_per_hidden = n_neurons_per_hidden
+        self.n_hidden_layers = n_hidden_layers
+        # (n_in, n_out) of each layer, in the order used by
+        # SimpleNeuralControllerNumpy.set_parameters
+        if(self.n_hidden_layers > 0):
+            self.shapes = [(self.dim_in, self.n_per_hidden)] + \
+                [(self.n_per_hidden, self.n_per_hidden)] * \
+                (self.n_hidden_layers-1) + \
+                [(self.n_per_hidden, self.dim_out)]
+        else:
+            self.shapes = [(self.dim_in, self.dim_out)]
+        self.n_weights = int(sum([i*o + o for (i, o) in self.shapes]))
+        self.weights = None
+        self.bias = None
+        self.size = 0
+
+    def set_parameters(self, population):
+        """
+        Set the parameters of the N networks from a sequence of N flat
+        genotypes (or a (N, n_weights) array)
+        """
+        flat = np.asarray(population, dtype=np.float64).reshape(
+            -1, self.n_weights)
+        self.size = flat.shape[0]
+        self.weights = list()
+        self.bias = list()
+        i = 0  # index
+        for (n_i, n_o) in self.shapes:
+            self.weights.append(
+                flat[:, i:(i+n_i*n_o)].reshape(self.size, n_i, n_o))
+            i += n_i*n_o
+        for (n_i, n_o) in self.shapes:
+            self.bias.append(flat[:, i:(i+n_o)])
+            i += n_o
+
+    def predict(self, x):
+        """
+        Propagate a (N, n_in) matrix of observations,
+        returns a (N, n_out) matrix of actions
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if(self.n_hidden_layers > 0):
+            # Input
+            y = sigmoid(np.einsum('ni,nio->no', x,
+                                  self.weights[0]) + self.bias[0])
+            # hidden -> hidden, same layer range as
+            # SimpleNeuralControllerNumpy.predict so that evolved genotypes
+            # behave identically
+            for i in range(1, self.n_hidden_layers-1):
+                y = sigmoid(np.einsum('ni,nio->no', y,
+                                      self.weights[i]) + self.bias[i])
+            # Out
+            return tanh(np.einsum('ni,nio->no', y,
+                                  self.weights[-1]) + self.bias[-1])
+        else:  # Simple monolayer perceptron
+            return tanh(np.einsum('ni,nio->no', x,
+                                  self.weights[0]) + self.bias[0])
+
+    def __call__(self, x):
+        """Calling the controller calls predict"""
+        return self.predict(x)
@@ -24,10 +24,12 @@ class NoveltyController:
         self._nn = SimpleNeuralControllerNumpy(*[10, 2, 2, 10])
         base_path = os.path.dirname(os.path.abspath(__file__))
 
-        creator.create("MyFitness", base.Fitness, weights=(-1.0,))
-        creator.create("Individual", array.array, typecode="d",
-                       fitness=creator.MyFitness, strategy=None)
-        creator.create("Strategy", array.array, typecode="d")
+        # created once per process, e.g. when a batch worker runs several individuals
+        if not hasattr(creator, "Individual"):
+            creator.create("MyFitness", base.Fitness, weights=(-1.0,))
+            creator.create("Individual", array.array, typecode="d",
+                           fitness=creator.MyFitness, strategy=None)
+            creator.create("Strategy", array.array, typecode="d")
 
         f = open(f"{base_path}/../../results/individuals/{file}.pkl", "rb")
         self._nn.set_parameters(pickle.load(f))
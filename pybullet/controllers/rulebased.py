@@ -1,5 +1,7 @@
 """The Rule Based controller class."""
 
+import numpy as np
+
 
 class RuleBasedController:
     """It's a Rule Based controller,
@@ -11,6 +13,9 @@ class RuleBasedController:
         _threshold: A float representing the threshold for a turn.
         _speed: A float between 0 and 1 representing the speed of the robot.
         _laser_range: A float indicating the range of the lasers.
+
+    get_commands computes the same actions for N robots at once from their (N, rays) laser ranges, e.g.
+    the observations of a vectorized env (the env given to the controller is not used, it can be None).
     """
 
     def __init__(self, env, laser_range=1, speed=0.5, threshold=0.7, verbose=False):
@@ -50,5 +55,25 @@ class RuleBasedController:
             print("NO WALL ")
         return [self.speed, self.speed]
 
+    def get_commands(self, observations):
+        """Calculates the futur actions of N robots.
+
+        Args:
+            observations: (N, rays) array of laser ranges.
+        Returns:
+            (N, 2) array of the actions, (-1)^a*speed for the left and right wheels.
+        """
+        # no walls detected => 0
+        proximity = self._laser_range - np.asarray(observations, dtype=float)
+        n_rays = proximity.shape[1]//2  # number of lasers on the left and right
+
+        wall_left = proximity[:, :n_rays].sum(axis=1) > self._threshold
+        wall_right = ~wall_left & (proximity[:, -n_rays:].sum(axis=1) > self._threshold)
+
+        commands = np.full((len(proximity), 2), self.speed)
+        commands[wall_left, 0] = -self.speed
+        commands[wall_right, 1] = -self.speed
+        return commands
+
     def reset(self):
         pass
@@ -6,12 +6,19 @@ base_path = os.path.dirname(__file__)
 
 
 def _register_single_agent(name: str, file: str):
-    scenario = SimpleNavScenario.from_spec(
-        path=f'{base_path}/../configuration/scenarios/{file}')
+    # only the path is recorded, the file is parsed by the entry point at the first gym.make
     register(
         id=name,
-        entry_point='iRobot_gym.envs:SimpleNavEnv',
-        kwargs={'scenario': scenario}
+        entry_point='iRobot_gym.envs:make_env',
+        kwargs={'path': os.path.abspath(f'{base_path}/../configuration/scenarios/{file}')}
+    )
+
+
+def _register_vector(name: str, file: str):
+    register(
+        id=name,
+        entry_point='iRobot_gym.envs:VectorNavEnv',
+        kwargs={'path': os.path.abspath(f'{base_path}/../configuration/scenarios/{file}')}
     )
 
 
@@ -20,3 +27,5 @@ for scenario_file in os.listdir(f'{base_path}/../configuration/scenarios'):
     name = f'{track_name}'
     _register_single_agent(
         name=f'{name}-v0', file=scenario_file)
+    _register_vector(
+        name=f'{name}_vec-v0', file=scenario_file)
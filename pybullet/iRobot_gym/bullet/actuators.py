@@ -12,11 +12,13 @@ class BulletActuator:
         self._name = name
         self._body_id = None
         self._joint_indices = []
+        self._client = 0
 
-    def reset(self, body_id, joint_indices):
-        """reset body id and joint indices."""
+    def reset(self, body_id, joint_indices, client=0):
+        """reset body id, joint indices and physics client id."""
         self._body_id = body_id
         self._joint_indices = joint_indices
+        self._client = client
 
     @property
     def body_id(self):
@@ -28,6 +30,11 @@ class BulletActuator:
         "return the joint indices."
         return self._joint_indices
 
+    @property
+    def client(self):
+        "return the physics client id."
+        return self._client
+
 
 class Motor(BulletActuator):
     """This class use PyBullet to make the wheels spins.
@@ -43,6 +50,7 @@ class Motor(BulletActuator):
 
     def __init__(self, name, config):
         """Inits Motor with the attributes values."""
+        super().__init__(name)
         self.name = name
         self._config = config
 
@@ -68,7 +76,8 @@ class Motor(BulletActuator):
             self.joint_indices,
             pybullet.VELOCITY_CONTROL,
             targetVelocities=[velocity2, velocity1],
-            forces=[self._config.max_force]*2
+            forces=[self._config.max_force]*2,
+            physicsClientId=self.client
         )
 
     def space(self):
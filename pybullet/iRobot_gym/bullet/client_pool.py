@@ -0,0 +1,74 @@
+"""Pool of headless pybullet physics clients with the scene already loaded."""
+
+import pybullet as p
+
+
+class ClientPool:
+    """Keeps N DIRECT physics clients with the scene, the goal and the physics parameters of a world loaded,
+    so that episodes can be run concurrently in one process without reconnecting or reloading the scene.
+
+    A client is taken with acquire and given back with release, which removes the bodies loaded
+    in it since (the robots), e.g.:
+
+        pool = ClientPool(scenario.world, 4)
+        client = pool.acquire()
+        env = SimpleNavEnv(scenario, client=client)
+        ...
+        env.close()
+        pool.release(client)
+
+    Each worker process of a multiprocessing pool should create its own ClientPool.
+
+    Attributes:
+        _world: World whose scene is loaded in the clients.
+        _free: list of int, ids of the clients that are not used.
+        _scene_bodies: dict, ids of the bodies of the scene, for each client.
+    """
+
+    def __init__(self, world, n_clients):
+        self._world = world
+        self._free = []
+        self._scene_bodies = {}
+        for _ in range(n_clients):
+            client = p.connect(p.DIRECT)
+            world.load(client)
+            self._scene_bodies[client] = self._bodies(client)
+            self._free.append(client)
+
+    @staticmethod
+    def _bodies(client):
+        return set(p.getBodyUniqueId(i, physicsClientId=client)
+                   for i in range(p.getNumBodies(physicsClientId=client)))
+
+    @property
+    def clients(self):
+        return list(self._scene_bodies.keys())
+
+    def acquire(self):
+        """Take a free client, raises a RuntimeError if all of them are used."""
+        if not self._free:
+            raise RuntimeError(
+                "No free physics client in the pool of %d" % len(self._scene_bodies))
+        return self._free.pop()
+
+    def release(self, client):
+        """Give a client back to the pool, after removing the bodies that are not part of the scene."""
+        for body in self._bodies(client) - self._scene_bodies[client]:
+            p.removeBody(body, physicsClientId=client)
+        p.removeAllUserDebugItems(physicsClientId=client)
+        self._free.append(client)
+
+    def close(self):
+        for client in self._scene_bodies:
+            p.disconnect(physicsClientId=client)
+        self._scene_bodies = {}
+        self._free = []
+
+    def __len__(self):
+        return len(self._scene_bodies)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -40,6 +40,7 @@ class SimulationConfig(YamlDataClassConfig):
     time_step: float = None
     GUI: bool = None
     following_camera: bool = False
+    headless: bool = False
 
 
 @dataclass
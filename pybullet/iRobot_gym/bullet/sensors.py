@@ -41,15 +41,21 @@ class BulletSensor(Sensor[T], ABC):
         super().__init__(name, type)
         self._body_id = None
         self._joint_index = None
+        self._client = 0
 
-    def reset(self, body_id: int, joint_index: int = None):
+    def reset(self, body_id: int, joint_index: int = None, client: int = 0):
         self._body_id = body_id
         self._joint_index = joint_index
+        self._client = client
 
     @property
     def body_id(self) -> int:
         return self._body_id
 
+    @property
+    def client(self) -> int:
+        return self._client
+
     @property
     def joint_index(self) -> int:
         return self._joint_index
@@ -75,8 +81,20 @@ class FixedTimestepSensor(BulletSensor[T], ABC):
             self._last_timestep = 0
         return self._last_observation
 
-    def reset(self, body_id: int, joint_index: int = None):
-        self._sensor.reset(body_id=body_id, joint_index=joint_index)
+    @property
+    def visible(self) -> bool:
+        return getattr(self._sensor, 'visible', False)
+
+    @visible.setter
+    def visible(self, visible: bool):
+        if hasattr(self._sensor, 'visible'):
+            self._sensor.visible = visible
+
+    def reset(self, body_id: int, joint_index: int = None, client: int = 0):
+        self._last_timestep = 0
+        self._last_observation = None
+        self._sensor.reset(body_id=body_id,
+                           joint_index=joint_index, client=client)
 
 
 class Laser(BulletSensor[NDArray[(Any,), np.float]]):
@@ -89,6 +107,7 @@ class Laser(BulletSensor[NDArray[(Any,), np.float]]):
         angle: float
         min_range: float
         visible: bool = True
+        num_threads: int = 1
 
     def __init__(self, name: str, type: str, config: Config):
         super().__init__(name, type)
@@ -103,6 +122,27 @@ class Laser(BulletSensor[NDArray[(Any,), np.float]]):
         self._from, self._to = self._setup_raycast(min_distance=self._min_range,
                                                    scan_range=self._range,
                                                    rays=self._rays)
+        # rayTestBatch parses lists faster than arrays, and the buffers are reused by every observe
+        self._from_list, self._to_list = self._from.tolist(), self._to.tolist()
+        self._hit_fractions = np.empty(self._rays)
+        self._noise = np.empty(self._rays)
+        self._rng = np.random.default_rng()
+
+    @property
+    def visible(self) -> bool:
+        """Whether the rays are drawn with debug lines at each observation."""
+        return self._config.visible
+
+    @visible.setter
+    def visible(self, visible: bool):
+        self._config.visible = visible
+
+    def reset(self, body_id: int, joint_index: int = None, client: int = 0):
+        if client != self.client:
+            self._ray_ids = []  # debug lines of another physics client
+        # seeded from the global generator, so that World.seed still makes the noise reproducible
+        self._rng = np.random.default_rng(np.random.randint(2**31))
+        super().reset(body_id=body_id, joint_index=joint_index, client=client)
 
     def _setup_raycast(self, min_distance: float, scan_range: float, rays: int):
         start = min_distance
@@ -136,22 +176,37 @@ class Laser(BulletSensor[NDArray[(Any,), np.float]]):
                               shape=(self._rays,))
 
     def observe(self) -> NDArray[(Any,), np.float]:
-        results = p.rayTestBatch(self._from, self._to, 0,
+        results = p.rayTestBatch(self._from_list, self._to_list, self._config.num_threads,
                                  parentObjectUniqueId=self.body_id,
-                                 parentLinkIndex=self.joint_index)
-        hit_fractions = np.array(results, dtype=np.object)[
-            :, 2].astype(dtype=np.float)
-        ranges = self._config.range * hit_fractions + self._config.min_range
-        noise = np.random.uniform(
-            1.0 - self._config.inaccuracy, 1.0 + self._config.inaccuracy, size=ranges.shape)
-        scan = np.clip(ranges * noise, a_min=self._config.min_range,
-                       a_max=self._config.range)
-        # print("noise", noise)
+                                 parentLinkIndex=self.joint_index,
+                                 physicsClientId=self.client)
+        for i, result in enumerate(results):
+            self._hit_fractions[i] = result[2]
+        return self._scan(self._hit_fractions)
+
+    def _scan(self, hit_fractions):
+        scan = self._config.range * hit_fractions + self._config.min_range
+        if self._config.inaccuracy != 0:
+            # uniform noise in [1 - inaccuracy, 1 + inaccuracy]
+            self._rng.random(out=self._noise)
+            self._noise *= 2 * self._config.inaccuracy
+            self._noise += 1.0 - self._config.inaccuracy
+            scan *= self._noise
+        np.clip(scan, a_min=self._config.min_range,
+                a_max=self._config.range, out=scan)
         if self._config.visible:
             self._display_rays(hit_fractions, scan)
 
         return scan
 
+    def ray_segments(self):
+        """(rays, 3) start and end points of the rays in the world frame, from the laser link pose."""
+        state = p.getLinkState(self.body_id, self.joint_index,
+                               physicsClientId=self.client)
+        position, orientation = state[4], state[5]
+        rotation = np.reshape(p.getMatrixFromQuaternion(orientation), (3, 3))
+        return self._from.dot(rotation.T) + position, self._to.dot(rotation.T) + position
+
     def _display_rays(self, hit_fractions, scan):
         angle = math.radians(self._config.angle_start) + np.pi / 2.0
         if self._rays == 1:
@@ -162,7 +217,8 @@ class Laser(BulletSensor[NDArray[(Any,), np.float]]):
             if len(self._ray_ids) < self._rays:
                 ray_id = p.addUserDebugLine(self._from[i], self._to[i], self._miss_color,
                                             parentObjectUniqueId=self.body_id,
-                                            parentLinkIndex=self.joint_index)
+                                            parentLinkIndex=self.joint_index,
+                                            physicsClientId=self.client)
                 self._ray_ids.append(ray_id)
 
             if (hit_fractions[i] == 1.):
@@ -182,7 +238,38 @@ class Laser(BulletSensor[NDArray[(Any,), np.float]]):
                 color,
                 replaceItemUniqueId=self._ray_ids[i],
                 parentObjectUniqueId=self.body_id,
-                parentLinkIndex=self.joint_index
+                parentLinkIndex=self.joint_index,
+                physicsClientId=self.client
             )
 
             angle += increment
+
+
+def observe_lasers(lasers, num_threads=0):
+    """Observe several lasers (e.g. of several robots) loaded in the same physics client with a single
+    rayTestBatch call, the rays being cast in the world frame.
+
+    This is not a faster path than calling observe on each laser: rayTestBatch costs the same per ray
+    in one call or in several, and the link poses are queried and applied here in Python instead of by
+    pybullet (see benchmark_laser.py).
+
+    Args:
+        lasers: list of Laser, reset in the same physics client.
+        num_threads: threads used by rayTestBatch (0 for all the available threads).
+    Returns:
+        A list with the scan of each laser.
+    """
+    if not lasers:
+        return []
+    segments = [laser.ray_segments() for laser in lasers]
+    results = p.rayTestBatch(np.concatenate([s[0] for s in segments]).tolist(),
+                             np.concatenate([s[1] for s in segments]).tolist(),
+                             num_threads, physicsClientId=lasers[0].client)
+    hit_fractions = np.fromiter((r[2] for r in results),
+                                dtype=np.float64, count=len(results))
+    scans = []
+    start = 0
+    for laser in lasers:
+        scans.append(laser._scan(hit_fractions[start:start+laser._rays]))
+        start += laser._rays
+    return scans
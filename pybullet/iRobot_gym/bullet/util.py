@@ -5,16 +5,18 @@ import numpy as np
 import pybullet
 
 
-def get_velocity(id):
+def get_velocity(id, client=0):
     """Ask PyBullet the velocity of the agent.
 
     Args:
         id: id of the agent.
+        client: id of the physics client.
     Return:
         [x, y, z, roll, pitch, yaw]
     """
-    linear, angular = pybullet.getBaseVelocity(id)
-    _, orientation = pybullet.getBasePositionAndOrientation(id)
+    linear, angular = pybullet.getBaseVelocity(id, physicsClientId=client)
+    _, orientation = pybullet.getBasePositionAndOrientation(
+        id, physicsClientId=client)
     rotation = pybullet.getMatrixFromQuaternion(orientation)
     rotation = np.reshape(rotation, (-1, 3)).transpose()
     linear = rotation.dot(linear)
@@ -22,15 +24,17 @@ def get_velocity(id):
     return np.append(linear, angular)
 
 
-def get_pose(id):
+def get_pose(id, client=0):
     """Ask PyBullet the position of the agent.
 
     Args:
         id: id of the agent.
+        client: id of the physics client.
     Return:
         [x, y, z, roll, pitch, yaw]
     """
-    position, orientation = pybullet.getBasePositionAndOrientation(id)
+    position, orientation = pybullet.getBasePositionAndOrientation(
+        id, physicsClientId=client)
     if any(np.isnan(position)) or any(np.isnan(orientation)):
         return None
     orientation = pybullet.getEulerFromQuaternion(orientation)
@@ -38,11 +42,35 @@ def get_pose(id):
     return pose
 
 
-def follow_agent(agent, width=640, height=480):
+def get_kinematics(id, client=0):
+    """Ask PyBullet the pose and the velocity of the agent, with a single query of each.
+
+    Args:
+        id: id of the agent.
+        client: id of the physics client.
+    Return:
+        ([x, y, z, roll, pitch, yaw], [vx, vy, vz, wx, wy, wz]) as tuples of floats,
+        the velocities in the frame of the agent as in get_velocity.
+    """
+    position, orientation = pybullet.getBasePositionAndOrientation(
+        id, physicsClientId=client)
+    linear, angular = pybullet.getBaseVelocity(id, physicsClientId=client)
+    r = pybullet.getMatrixFromQuaternion(orientation)
+    # transposed rotation (row-major r) times the velocities, on floats: cheaper than numpy for 3-vectors
+    velocity = (r[0]*linear[0] + r[3]*linear[1] + r[6]*linear[2],
+                r[1]*linear[0] + r[4]*linear[1] + r[7]*linear[2],
+                r[2]*linear[0] + r[5]*linear[1] + r[8]*linear[2],
+                r[0]*angular[0] + r[3]*angular[1] + r[6]*angular[2],
+                r[1]*angular[0] + r[4]*angular[1] + r[7]*angular[2],
+                r[2]*angular[0] + r[5]*angular[1] + r[8]*angular[2])
+    return position + pybullet.getEulerFromQuaternion(orientation), velocity
+
+
+def follow_agent(agent, width=640, height=480, client=0):
     """The camera that follow the agent.
     """
     position, orientation = pybullet.getBasePositionAndOrientation(
-        agent.vehicle_id)
+        agent.vehicle_id, physicsClientId=client)
     _, _, yaw = pybullet.getEulerFromQuaternion(orientation)
     orientation = pybullet.getQuaternionFromEuler((0, 0, yaw))
     rot_matrix = pybullet.getMatrixFromQuaternion(orientation)
@@ -66,7 +94,8 @@ def follow_agent(agent, width=640, height=480):
         height=height,
         renderer=pybullet.ER_BULLET_HARDWARE_OPENGL,
         viewMatrix=view_matrix,
-        projectionMatrix=proj_matrix)
+        projectionMatrix=proj_matrix,
+        physicsClientId=client)
 
     rgb_array = np.reshape(rgb_image, (height, width, -1))
     rgb_array = rgb_array[:, :, :3]
@@ -12,6 +12,7 @@ class IRobot:
         _config: config contening the urdf file of the agent.
         _actuators: dict representing the different actuators.
         _sensors: object representing the sensors.
+        _client: id of the physics client the robot is loaded in.
     """
     @dataclass
     class Config:
@@ -20,6 +21,7 @@ class IRobot:
     def __init__(self, sensors, actuators, config):
         """Inits IRobot with the attributes values."""
         self._id = None
+        self._client = 0
         self._config = config
         self._actuators = dict([(a.name, a) for a in actuators])
         self._sensors = sensors
@@ -40,42 +42,66 @@ class IRobot:
             observations = sensor.observe()
         return observations
 
-    def reset(self, pose):
-        if not self._id:
+    def reset(self, pose, client=0):
+        if not self._id or client != self._client:
+            self._client = client
             self._id = self._load_model(
                 self._config.urdf_file, initial_pose=pose)
         else:
             pos, orn = pose
             pybullet.resetBasePositionAndOrientation(
-                self._id, pos, pybullet.getQuaternionFromEuler(orn))
+                self._id, pos, pybullet.getQuaternionFromEuler(orn), physicsClientId=self._client)
+        self.reset_devices()
 
+    def reset_devices(self):
+        """Reset the sensors and the actuators, e.g. after the simulation state was restored."""
         for sensor in self.sensors:
             joint_index = None
             if sensor.type in self._sensor_indices:
                 joint_index = self._sensor_indices[sensor.type]
-            sensor.reset(body_id=self._id, joint_index=joint_index)
+            sensor.reset(body_id=self._id,
+                         joint_index=joint_index, client=self._client)
 
         for name, actuator in self.actuators.items():
             joint_indices = None
             if name in self._actuator_indices:
                 joint_indices = self._actuator_indices[name]
-            actuator.reset(body_id=self._id, joint_indices=joint_indices)
+            actuator.reset(body_id=self._id,
+                           joint_indices=joint_indices, client=self._client)
+        # the motor commands are not part of the saved simulation states: stop the wheels
+        self.control((0, 0))
+
+    def hide_sensors(self):
+        """Stop drawing the sensors (e.g. the laser rays) in the simulation."""
+        for sensor in self.sensors:
+            sensor.visible = False
+
+    def close(self):
+        """Forget the robot body, removed with its physics client or by ClientPool.release."""
+        self._id = None
 
     def _load_model(self, model, initial_pose):
         position, orientation = initial_pose
         orientation = pybullet.getQuaternionFromEuler(orientation)
-        return pybullet.loadURDF(model, position, orientation)
+        return pybullet.loadURDF(model, position, orientation, physicsClientId=self._client)
 
     def _get_info(self):
-        for k in range(pybullet.getNumJoints(id)):
-            print("ID", id, pybullet.getJointInfo(id, k))
-            print("dynamic: ", pybullet.getDynamicsInfo(id, k))
-        print("dynamic: ", pybullet.getDynamicsInfo(id, -1))
+        for k in range(pybullet.getNumJoints(self._id, physicsClientId=self._client)):
+            print("ID", self._id, pybullet.getJointInfo(
+                self._id, k, physicsClientId=self._client))
+            print("dynamic: ", pybullet.getDynamicsInfo(
+                self._id, k, physicsClientId=self._client))
+        print("dynamic: ", pybullet.getDynamicsInfo(
+            self._id, -1, physicsClientId=self._client))
 
     @property
     def id(self):
         return self._id
 
+    @property
+    def client(self):
+        return self._client
+
     @property
     def sensors(self):
         return self._sensors
@@ -15,6 +15,10 @@ import pybullet as p
 from iRobot_gym.bullet import util
 from iRobot_gym.bullet.configs import GoalConfig, SimulationConfig, PhysicsConfig
 
+# kinematic snapshot of an agent, updated once per step by World.state
+snapshot_dtype = np.dtype([('pose', np.float64, (6,)), ('velocity', np.float64, (6,)),
+                           ('acceleration', np.float64, (6,)), ('time', np.float64), ('dist_obj', np.float64)])
+
 
 class World:
     """In this Class we import all our parameters and initialize all our objects and update the stat of the agent.
@@ -22,8 +26,15 @@ class World:
     Attributes:
         _time: A float representing the time of the simulation.
         _agents: An Agent object (the robot).
-        _state: A dictionary that will contain the position, acceleration, velocity, distance to objectif of the agent.
+        _client: int, id of the pybullet physics client of the simulation.
+        _snapshot: structured array (one record per agent, snapshot_dtype) of the pose, velocity, acceleration,
+            time and distance to the goal of the agents, preallocated and overwritten at each step.
+        _state: A dictionary that will contain the position, acceleration, velocity, distance to objectif of the agent,
+            the arrays being views of _snapshot.
+        _gui_client: class attribute, id of the GUI physics client of the process (pybullet allows only one).
     """
+    _gui_client = None
+
     @dataclass
     class Config:
         name: str
@@ -37,65 +48,128 @@ class World:
         self._config = config
         self._time = 0.0
         self._agents = agents
-        self._state = dict([(a.id, {}) for a in agents])
+        self._snapshot = np.zeros(len(agents), dtype=snapshot_dtype)
+        # views of the fields, cheaper to index at each step
+        self._poses, self._velocities, self._accelerations, self._times, self._distances = (
+            self._snapshot[name] for name in snapshot_dtype.names)
+        self._reset_state()
+        self._client = None
+        self._own_client = False
+        self._saved_state = None
 
-    def init(self):
-        """Init the simulation by loading the scene, the goal, the agent, the physics and the camera"""
+    @property
+    def headless(self):
+        return self._config.simulation_config.headless
 
-        if self._config.simulation_config.GUI:
-            p.connect(p.GUI)  # render True
-        else:
-            p.connect(p.DIRECT)  # render False
+    def set_headless(self):
+        """Run the simulation without GUI, following camera and debug visualizer."""
+        self._config.simulation_config.headless = True
+        self.set_direct()
 
-        self._load_scene(self._config.sdf)
-        self._load_goal()
-        p.setTimeStep(self._config.simulation_config.time_step)
+    def set_direct(self):
+        """Simulate in a DIRECT physics client, without GUI nor following camera."""
+        self._config.simulation_config.GUI = False
+        self._config.simulation_config.following_camera = False
 
-        if not (self._config.simulation_config.GUI and self._config.simulation_config.following_camera):
-            p.configureDebugVisualizer(p.COV_ENABLE_GUI, 0)
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def client(self):
+        return self._client
+
+    def init(self, client=None):
+        """Init the simulation by loading the scene, the goal, the agent, the physics and the camera
 
-        p.setGravity(0, 0, self._config.physics_config.gravity)
+        Args:
+            client: id of a physics client whose scene is already loaded (see ClientPool),
+                if None a new client is connected and the scene is loaded into it.
+        """
+        if client is None:
+            if self._config.simulation_config.GUI and World._gui_client is not None:
+                # several worlds in the same process: only the first one has the GUI
+                self.set_direct()
+            if self._config.simulation_config.GUI:
+                self._client = p.connect(p.GUI)  # render True
+                World._gui_client = self._client
+            else:
+                self._client = p.connect(p.DIRECT)  # render False
+            self._own_client = True
+            self.load(self._client)
+        else:
+            self._client = client
+            self._own_client = False
+
+        if self.headless:
+            return
+        if not (self._config.simulation_config.GUI and self._config.simulation_config.following_camera):
+            p.configureDebugVisualizer(
+                p.COV_ENABLE_GUI, 0, physicsClientId=self._client)
 
         p.resetDebugVisualizerCamera(
             cameraDistance=0.75*self._config.scale, cameraYaw=0, cameraPitch=-89.999,
-            cameraTargetPosition=[self._config.scale/2, self._config.scale/2, 0])
+            cameraTargetPosition=[self._config.scale/2, self._config.scale/2, 0], physicsClientId=self._client)
+
+    def load(self, client):
+        """Load the scene, the goal and the physics parameters in the given physics client."""
+        self._load_scene(self._config.sdf, client)
+        self._load_goal(client)
+        p.setTimeStep(self._config.simulation_config.time_step,
+                      physicsClientId=client)
+        p.setGravity(0, 0, self._config.physics_config.gravity,
+                     physicsClientId=client)
 
-    def _load_scene(self, sdf_file: str):
-        p.loadURDF(sdf_file, globalScaling=self._config.scale)
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.loadURDF('plane.urdf')
+    def _load_scene(self, sdf_file: str, client):
+        p.loadURDF(sdf_file, globalScaling=self._config.scale,
+                   physicsClientId=client)
+        p.setAdditionalSearchPath(
+            pybullet_data.getDataPath(), physicsClientId=client)
+        p.loadURDF('plane.urdf', physicsClientId=client)
 
-    def _load_goal(self):
+    def _load_goal(self, client):
         base_path = os.path.dirname(os.path.abspath(__file__))
         p.loadURDF(f'{base_path}/../../models/scenes/goal.urdf',
-                   self._config.goal_config.goal_position, globalScaling=self._config.goal_config.goal_size)
+                   self._config.goal_config.goal_position, globalScaling=self._config.goal_config.goal_size,
+                   physicsClientId=client)
 
     @classmethod
     def _get_starting_position(cls, agent):
         return agent.starting_position, agent.starting_orientation
 
-    def _update_info(self, agent):
-        goal_pos = self._config.goal_config.goal_position
+    def _reset_state(self):
+        """Zero the snapshot (the first acceleration is then velocity / time_step) and rebuild the state dicts."""
+        self._snapshot[:] = 0
+        self._last_velocities = [(0.,)*6 for _ in self._agents]
+        self._state = dict([(a.id, {'pose': self._poses[i],
+                                    'velocity': self._velocities[i],
+                                    'acceleration': self._accelerations[i],
+                                    'time': 0.0, 'dist_obj': 0.0})
+                            for i, a in enumerate(self._agents)])
 
-        pose = util.get_pose(id=agent.vehicle_id)
-        if pose is None:
-            self._state[agent.id]['pose'] = np.append((0, 0, 0), (0, 0, 0))
-        else:
-            self._state[agent.id]['pose'] = pose
+    def _update_info(self, agent, index):
+        goal_pos = self._config.goal_config.goal_position
+        time_step = self._config.simulation_config.time_step
 
-        velocity = util.get_velocity(id=agent.vehicle_id)
-        if 'velocity' in self._state[agent.id]:
-            previous_velocity = self._state[agent.id]['velocity']
-            self._state[agent.id]['acceleration'] = (
-                velocity - previous_velocity) / self._config.simulation_config.time_step
-        else:
-            self._state[agent.id]['acceleration'] = velocity / \
-                self._config.simulation_config.time_step
-        self._state[agent.id]['velocity'] = velocity
+        pose, velocity = util.get_kinematics(
+            id=agent.vehicle_id, client=self._client)
+        if math.isnan(sum(pose)):
+            pose = (0.,)*6
+        previous_velocity = self._last_velocities[index]
+        self._last_velocities[index] = velocity
 
-        self._state[agent.id]['time'] = self._time
-        self._state[agent.id]['dist_obj'] = math.sqrt(
+        self._poses[index] = pose
+        self._velocities[index] = velocity
+        self._accelerations[index] = [
+            (v - w) / time_step for v, w in zip(velocity, previous_velocity)]
+        dist_obj = math.sqrt(
             (pose[0]-goal_pos[0])**2+(pose[1]-goal_pos[1])**2)
+        self._times[index] = self._time
+        self._distances[index] = dist_obj
+
+        agent_state = self._state[agent.id]
+        agent_state['time'] = self._time
+        agent_state['dist_obj'] = dist_obj
 
     def update(self, agent_id: str, width=640, height=480):
         """moves the simulation forward: incremente the time,
@@ -106,18 +180,29 @@ class World:
             width: A int, the width of the camera.
             height: A int, the height of the camera.
         """
-        p.stepSimulation()
+        p.stepSimulation(physicsClientId=self._client)
         self._time += self._config.simulation_config.time_step
         if self._config.simulation_config.GUI and self._config.simulation_config.following_camera:
             agent = list(filter(lambda a: a.id == agent_id, self._agents))
-            util.follow_agent(agent=agent[0], width=width, height=height)
+            util.follow_agent(agent=agent[0], width=width,
+                              height=height, client=self._client)
 
     def state(self):
-        """Update state of the agents"""
-        for agent in self._agents:
-            self._update_info(agent=agent)
+        """Update state of the agents.
+
+        Returns:
+            A dict of agent states (pose, velocity, acceleration, time, dist_obj), reused at each step: the arrays are
+            views of the snapshot and are overwritten by the next call, they must be copied to be kept.
+        """
+        for i, agent in enumerate(self._agents):
+            self._update_info(agent=agent, index=i)
         return self._state
 
+    @property
+    def snapshot(self):
+        """Structured array (snapshot_dtype) of the kinematics of the agents at the last call of state."""
+        return self._snapshot
+
     def render(self, agent_id, width=640, height=480):
         """render the following camera.
 
@@ -125,9 +210,13 @@ class World:
             agent_id: String, the agent id.
             width: A int, the width of the camera.
             height: A int, the height of the camera.
+        Returns:
+            The RGB image, None in headless mode.
         """
+        if self.headless:
+            return None
         agent = list(filter(lambda a: a.id == agent_id, self._agents))
-        return util.follow_agent(agent=agent[0], width=width, height=height)
+        return util.follow_agent(agent=agent[0], width=width, height=height, client=self._client)
 
     def seed(self, seed=None):
         """Generate a seed if needed"""
@@ -138,10 +227,36 @@ class World:
 
     def reset(self):
         """reset the class"""
-        p.setTimeStep(self._config.simulation_config.time_step)
-        p.stepSimulation()
+        p.setTimeStep(self._config.simulation_config.time_step,
+                      physicsClientId=self._client)
+        p.stepSimulation(physicsClientId=self._client)
+        self._time = 0.0
+        self._reset_state()
+
+    def save_state(self):
+        """Snapshot of the simulation (poses, velocities, contacts...) restored by restore_state."""
+        if self._saved_state is not None:
+            p.removeState(self._saved_state, physicsClientId=self._client)
+        self._saved_state = p.saveState(physicsClientId=self._client)
+
+    def restore_state(self):
+        """Restore the snapshot of save_state and reset the time and the state of the agents."""
+        p.restoreState(stateId=self._saved_state,
+                       physicsClientId=self._client)
         self._time = 0.0
-        self._state = dict([(a.id, {}) for a in self._agents])
+        self._reset_state()
+
+    def close(self):
+        """Remove the snapshot and disconnect the physics client if it was connected by init."""
+        if self._own_client:
+            p.disconnect(physicsClientId=self._client)
+            if World._gui_client == self._client:
+                World._gui_client = None
+        elif self._saved_state is not None:
+            p.removeState(self._saved_state, physicsClientId=self._client)
+        self._saved_state = None
+        self._client = None
+        self._own_client = False
 
     def space(self):
         """Descibe the format of valid action for gym."""
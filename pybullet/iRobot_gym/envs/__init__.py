@@ -1 +1,2 @@
-from .nav_env import SimpleNavEnv, SimpleNavScenario
+from .nav_env import SimpleNavEnv, SimpleNavScenario, make_env
+from .vector_env import VectorNavEnv
@@ -1,53 +1,101 @@
-import math
 import gym
+import numpy as np
 from .scenarios import SimpleNavScenario
+from .tasks import make_task
 
 
 class SimpleNavEnv(gym.Env):
+    """Navigation of the robot in a scenario simulated by pybullet.
 
-    def __init__(self, scenario):
+    Attributes:
+        _scenario: SimpleNavScenario, the world and the agent.
+        _client: id of a physics client with the scene already loaded (see ClientPool),
+            None to connect a new one at the first reset.
+
+    The headless profile (gym.make(..., headless=True)) disables the GUI, the camera and the drawing of the rays.
+
+    With frame_skip=k, each action is applied for k physics steps: the robot observes and receives its
+    command once, the rewards of the k steps are summed and the episode stops at the first step that is done.
+    step(action, frames) applies an action for another number of physics steps, and info['frames'] is the
+    number of physics steps actually run.
+
+    Each env has its own scenario (world, agent, robot and sensors) built from the cached spec by make_env,
+    simulated in its own physics client, so that several envs can be stepped side by side in one process.
+    """
+
+    def __init__(self, scenario, client=None, headless=False, frame_skip=1):
         self._scenario = scenario
+        if frame_skip < 1:
+            raise RuntimeError("frame_skip must be at least 1, not %s" % str(frame_skip))
+        self._frame_skip = frame_skip
+        if headless:
+            self._scenario.set_headless()
+        self._client = client
         self._initialized = False
         self._time = 0.0
+        self.observation_space = self._scenario.agent.observation_space
+        self.action_space = self._scenario.agent.action_space
 
         self.observation = dict()
-        if self._scenario.agent.task_name == 'reward_rapprochement_goal':
-            self._RewardFunction = RewardRapprochementGoal(
-                self._scenario.agent.task_param)
-        elif self._scenario.agent.task_name == 'reward_binary_goal_based':
-            self._RewardFunction = RewardBinaryGoalBased(
-                self._scenario.agent.task_param)
-        elif self._scenario.agent.task_name == 'no_reward':
-            self._RewardFunction = NoReward(
-                self._scenario.agent.task_param)
-        elif self._scenario.agent.task_name == 'reward_displacement':
-            self._RewardFunction = RewardDisplacement(
-                self._scenario.agent.task_param)
+        self._task = make_task(self._scenario.agent.task_name,
+                               self._scenario.agent.task_param)
 
     @ property
     def scenario(self):
         return self._scenario
 
-    def step(self, action):
-        state = self._scenario.world.state()
-        self.observation, _ = self._scenario.agent.step(action=action)
-        done = self._RewardFunction.done(self._scenario.agent.id, state)
-        reward = self._RewardFunction.reward(
-            self._scenario.agent.id, state, action)
+    @property
+    def client(self):
+        """Id of the physics client of the env, None before the first reset."""
+        return self._scenario.world.client
+
+    @property
+    def frame_skip(self):
+        return self._frame_skip
+
+    def advance(self, action, first=True):
+        """One physics step, without evaluating the task: the world snapshot is updated with the state of
+        the robot before the step, which receives the action (and observes) only if first.
+
+        Returns:
+            The state of the robot (pose, velocity, acceleration, time, dist_obj), copied from the world
+            snapshot that the next steps overwrite.
+        """
+        state = self._scenario.world.state()[self._scenario.agent.id]
+        if first:
+            # the wheels keep the velocity command during the next steps
+            self.observation, _ = self._scenario.agent.step(action=action)
         self._time = self._scenario.world.update(
             agent_id=self._scenario.agent.id)
-        return self.observation, reward, done, state[self._scenario.agent.id]
+        return {name: np.copy(value) if isinstance(value, np.ndarray) else value
+                for name, value in state.items()}
+
+    def step(self, action, frames=None):
+        reward = 0.
+        for i in range(self._frame_skip if frames is None else frames):
+            info = self.advance(action, first=i == 0)
+            rewards, dones = self._task.evaluate(self._scenario.world.snapshot)
+            reward += rewards[0]
+            done = bool(dones[0])
+            if done:
+                break
+        info['frames'] = i + 1
+        return self.observation, reward, done, info
 
     def reset(self):
+        # the simulation state is saved once the scene, the goal and the robot are loaded,
+        # the next episodes restore it, so that they all start from the exact same state
         if not self._initialized:
-            self._scenario.world.init()
+            self._scenario.world.init(client=self._client)
+            obs = self._scenario.agent.reset(
+                self._scenario.world._get_starting_position(self._scenario.agent), client=self._scenario.world.client)
+            self._scenario.world.save_state()
             self._initialized = True
         else:
-            self._scenario.world.reset()
-        obs = self._scenario.agent.reset(
-            self._scenario.world._get_starting_position(self._scenario.agent))
+            self._scenario.world.restore_state()
+            obs = self._scenario.agent.restart()
         self._scenario.world.update(agent_id=self._scenario.agent.id)
-        self._RewardFunction.reset()
+        self._task.reset()
         return obs
 
     def render(self, **kwargs):
@@ -56,103 +104,16 @@ class SimpleNavEnv(gym.Env):
     def seed(self, seed=None):
         self._scenario.world.seed(seed)
 
+    def close(self):
+        if self._initialized:
+            self._scenario.agent.close()
+            self._scenario.world.close()
+            self._initialized = False
+
     def get_laserranges(self):
         return self.observation
 
 
-class NoReward:
-    """ No reward"""
-
-    def __init__(self, param):
-        self._time_limit = param['time_limit']
-        self._goal_size_detection = param['goal_size_detection']
-
-    def reward(self, _agent_id, _state, _action):
-        return 0
-
-    def done(self, agent_id, state):
-        agent_state = state[agent_id]
-        if agent_state['dist_obj'] < self._goal_size_detection:
-            return True
-        return self._time_limit < agent_state['time'] and self._time_limit > 0
-
-    def reset(self):
-        pass
-
-
-class RewardBinaryGoalBased:
-    """ Reward of 1 is given when close enough to the goal. """
-
-    def __init__(self, param):
-        self._time_limit = param['time_limit']
-        self._goal_size_detection = param['goal_size_detection']
-
-    def reward(self, agent_id, state, _action):
-        agent_state = state[agent_id]
-        if agent_state['dist_obj'] < self._goal_size_detection:
-            return 1
-        return 0
-
-    def done(self, agent_id, state):
-        agent_state = state[agent_id]
-        if agent_state['dist_obj'] < self._goal_size_detection:
-            return True
-        return self._time_limit < agent_state['time'] and self._time_limit > 0
-
-    def reset(self):
-        pass
-
-
-class RewardDisplacement:
-    """ Reward = distance to previous position"""
-
-    def __init__(self, param):
-        self._time_limit = param['time_limit']
-        self._goal_size_detection = param['goal_size_detection']
-        self._last_stored_pos = None
-
-    def reward(self, agent_id, state, action):
-        agent_state = state[agent_id]
-        pose = agent_state['pose']
-        if self._last_stored_pos is None:
-            self._last_stored_pos = pose
-        reward = math.sqrt((pose[0] - self._last_stored_pos[0])**2 +
-                           (pose[1] - self._last_stored_pos[1])**2)
-        self._last_stored_pos = pose
-        return reward
-
-    def done(self, agent_id, state):
-        agent_state = state[agent_id]
-        if agent_state['dist_obj'] < self._goal_size_detection:
-            return True
-        return self._time_limit < agent_state['time'] and self._time_limit > 0
-
-    def reset(self):
-        self._last_stored_pos = None
-
-
-class RewardRapprochementGoal:
-    """ Reward when you reduce the distance to the goal"""
-
-    def __init__(self, param):
-        self._time_limit = param['time_limit']
-        self._goal_size_detection = param['goal_size_detection']
-        self._last_stored_progress = None
-
-    def reward(self, agent_id, state, _action):
-        agent_state = state[agent_id]
-        progress = agent_state['dist_obj']
-        if self._last_stored_progress is None:
-            self._last_stored_progress = progress
-        reward = (-1)*(progress - self._last_stored_progress)
-        self._last_stored_progress = progress
-        return reward
-
-    def done(self, agent_id, state):
-        agent_state = state[agent_id]
-        if agent_state['dist_obj'] < self._goal_size_detection:
-            return True
-        return (self._time_limit < agent_state['time'] and self._time_limit > 0)
-
-    def reset(self):
-        self._last_stored_progress = None
+def make_env(path, client=None, headless=False, frame_skip=1):
+    """Entry point of the registered environments: builds the scenario of the file path from its cached spec."""
+    return SimpleNavEnv(SimpleNavScenario.from_spec(path), client=client, headless=headless, frame_skip=frame_skip)
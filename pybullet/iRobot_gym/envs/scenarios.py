@@ -1,5 +1,7 @@
 """ load .yml configuration files"""
 import os
+import copy
+import functools
 from dataclasses import dataclass
 from typing import Any
 
@@ -47,26 +49,62 @@ class Agent:
     def vehicle_id(self) -> Any:
         return self._vehicle.id
 
+    @property
+    def observation_space(self):
+        """Space of the observations of the last sensor, the one returned by step."""
+        return self._vehicle.sensors[-1].space()
+
+    @property
+    def action_space(self):
+        return self._vehicle.actuators['motor'].space()
+
     def step(self, action):
         observation = self._vehicle.observe()
         self._vehicle.control(action)
         return observation, {}
 
-    def reset(self, pose):
-        self._vehicle.reset(pose=pose)
+    def reset(self, pose, client=0):
+        self._vehicle.reset(pose=pose, client=client)
         observation = self._vehicle.observe()
         return observation
 
+    def restart(self):
+        """Reset the sensors and the actuators, the pose being restored with the simulation state."""
+        self._vehicle.reset_devices()
+        observation = self._vehicle.observe()
+        return observation
 
-def load_vehicle(spec: VehicleSpec):
-    config_file_path = f'{base_path}/../../configuration/robots/{spec.name}.yml'
+    def hide_sensors(self):
+        self._vehicle.hide_sensors()
+
+    def close(self):
+        self._vehicle.close()
+
+
+@functools.lru_cache(maxsize=None)
+def load_scenario_spec(path: str) -> ScenarioSpec:
+    """Parsed scenario file, cached: the result is shared and must not be modified (see SimpleNavScenario.from_spec)."""
+    spec = ScenarioSpec()
+    spec.load(path)
+    return spec
+
+
+@functools.lru_cache(maxsize=None)
+def load_vehicle_config(name: str) -> VehicleConfig:
+    """Parsed robot file, cached: the result is shared and must not be modified."""
+    config_file_path = f'{base_path}/../../configuration/robots/{name}.yml'
     if not os.path.exists(config_file_path):
         raise NotImplementedError(
-            f'No vehicle with name {spec.name} implemented.')
+            f'No vehicle with name {name} implemented.')
 
     config = VehicleConfig()
     config.load(config_file_path)
     config.urdf_file = f'{os.path.dirname(config_file_path)}/{config.urdf_file}'
+    return config
+
+
+def load_vehicle(spec: VehicleSpec):
+    config = load_vehicle_config(spec.name)
     requested_sensors = set(spec.sensors)
     available_sensors = set([sensor.name for sensor in config.sensors])
 
@@ -85,10 +123,6 @@ def load_vehicle(spec: VehicleSpec):
 
 
 def load_world(spec: WorldSpec, agents):
-    config_file_path = f'{base_path}/../../configuration/scenarios/{spec.name}.yml'
-    config = ScenarioSpec()
-    config.load(config_file_path)
-
     sdf_path = f'{base_path}/../../models/scenes/{spec.name}/{spec.sdf}'
 
     world_config = World.Config(
@@ -108,13 +142,22 @@ class SimpleNavScenario:
     world: World
     agent: Agent
 
+    def set_headless(self):
+        """Headless profile: DIRECT physics client, no debug lines, camera or visualizer calls,
+        so that a step only costs the physics and the raycast."""
+        self.world.set_headless()
+        self.agent.hide_sensors()
+
     @staticmethod
-    def from_spec(path, rendering=False):
-        spec = ScenarioSpec()
-        spec.load(path)
+    def from_spec(path, rendering=False, headless=False):
+        # the world configuration is modified by the simulation (e.g. the headless profile): copy the cached spec
+        spec = copy.deepcopy(load_scenario_spec(os.path.abspath(path)))
         if rendering:
             spec.world.rendering = rendering
         agent_spec = spec.agents
         agent = Agent(id=agent_spec.id, vehicle=load_vehicle(agent_spec.vehicle), task_name=agent_spec.task.task_name,
                       task_param=agent_spec.task.params, starting_position=agent_spec.starting_position, starting_orientation=agent_spec.starting_orientation)
-        return SimpleNavScenario(world=load_world(spec.world, agents=[agent]), agent=agent)
+        scenario = SimpleNavScenario(world=load_world(spec.world, agents=[agent]), agent=agent)
+        if headless or spec.world.simulation.headless:
+            scenario.set_headless()
+        return scenario
@@ -0,0 +1,123 @@
+"""Tasks of the agents: reward and end of episode, computed together for arrays of agents.
+
+A task is evaluated on the kinematic snapshot of the world (World.snapshot, one record per agent)
+or on any structured array with the 'pose', 'time' and 'dist_obj' fields of snapshot_dtype, e.g. the
+snapshots of N simulations concatenated by a vectorized env.
+"""
+
+import numpy as np
+
+
+class Task:
+    """Base class of the tasks: the episode is done when the goal is reached or when the time limit
+    (if positive) is exceeded.
+
+    Attributes:
+        _time_limit: float, duration of an episode, no limit if not positive.
+        _goal_size_detection: float, distance under which the goal is reached.
+    """
+
+    def __init__(self, param):
+        self._time_limit = param['time_limit']
+        self._goal_size_detection = param['goal_size_detection']
+
+    def _goal_reached(self, snapshot):
+        return snapshot['dist_obj'] < self._goal_size_detection
+
+    def _done(self, snapshot):
+        done = self._goal_reached(snapshot)
+        if self._time_limit > 0:
+            done |= self._time_limit < snapshot['time']
+        return done
+
+    def evaluate(self, snapshot):
+        """Reward and end of episode of each agent.
+
+        Args:
+            snapshot: structured array of N agent records.
+        Returns:
+            (reward, done): float array and bool array of shape (N,).
+        """
+        return self._reward(snapshot), self._done(snapshot)
+
+    def _reward(self, snapshot):
+        raise NotImplementedError
+
+    def reset(self, agents=None):
+        """Forgets the previous steps of the agents (indices or boolean mask), of all of them if None."""
+        pass
+
+
+class NoReward(Task):
+    """ No reward"""
+
+    def _reward(self, snapshot):
+        return np.zeros(len(snapshot))
+
+
+class RewardBinaryGoalBased(Task):
+    """ Reward of 1 is given when close enough to the goal. """
+
+    def _reward(self, snapshot):
+        return self._goal_reached(snapshot).astype(float)
+
+
+class RewardDisplacement(Task):
+    """ Reward = distance to previous position"""
+
+    def __init__(self, param):
+        super().__init__(param)
+        self._last_stored_pos = None
+
+    def _reward(self, snapshot):
+        # copy: the snapshot is overwritten at the next step
+        position = snapshot['pose'][:, :2].copy()
+        if self._last_stored_pos is None:
+            self._last_stored_pos = position
+        # the agents reset since the last step (nan) start from their current position
+        delta = position - np.where(np.isnan(self._last_stored_pos), position, self._last_stored_pos)
+        reward = np.sqrt(delta[:, 0]**2 + delta[:, 1]**2)
+        self._last_stored_pos = position
+        return reward
+
+    def reset(self, agents=None):
+        if agents is None or self._last_stored_pos is None:
+            self._last_stored_pos = None
+        else:
+            self._last_stored_pos[agents] = np.nan
+
+
+class RewardRapprochementGoal(Task):
+    """ Reward when you reduce the distance to the goal"""
+
+    def __init__(self, param):
+        super().__init__(param)
+        self._last_stored_progress = None
+
+    def _reward(self, snapshot):
+        progress = snapshot['dist_obj'].copy()
+        if self._last_stored_progress is None:
+            self._last_stored_progress = progress
+        last = np.where(np.isnan(self._last_stored_progress), progress, self._last_stored_progress)
+        reward = (-1)*(progress - last)
+        self._last_stored_progress = progress
+        return reward
+
+    def reset(self, agents=None):
+        if agents is None or self._last_stored_progress is None:
+            self._last_stored_progress = None
+        else:
+            self._last_stored_progress[agents] = np.nan
+
+
+tasks = {'reward_rapprochement_goal': RewardRapprochementGoal,
+         'reward_binary_goal_based': RewardBinaryGoalBased,
+         'reward_displacement': RewardDisplacement,
+         'no_reward': NoReward}
+
+
+def make_task(name, param):
+    """Task registered under name, with its parameters (time_limit and goal_size_detection)."""
+    if name not in tasks:
+        raise RuntimeError("Unknown task '%s'" % str(name))
+    return tasks[name](param)
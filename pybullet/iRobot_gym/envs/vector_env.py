@@ -0,0 +1,194 @@
+"""N pybullet navigation simulations stepped together, in the same process or in worker processes."""
+
+import multiprocessing
+import gym
+import numpy as np
+
+from iRobot_gym.bullet.world import snapshot_dtype
+from .nav_env import make_env
+from .tasks import make_task
+
+
+class _EnvBatch:
+    """Steps a list of SimpleNavEnv, reading the actions from and writing the results to arrays
+    (the slices of the shared buffers owned by a worker process, or plain arrays in-process).
+
+    The envs only advance their physics: the rewards and dones of all of them are computed by a single
+    task, evaluated once per physics step on the concatenation of their snapshots.
+    """
+
+    def __init__(self, envs, buffers):
+        self.envs = envs
+        self.obs, self.rewards, self.dones, self.actions, self.poses, self.dist_obj, self.times, \
+            self.terminal_obs = buffers
+        agent = envs[0].scenario.agent
+        self._task = make_task(agent.task_name, agent.task_param)
+        self._snapshots = np.zeros(len(envs), dtype=snapshot_dtype)
+
+    def step(self):
+        # as SimpleNavEnv.step: an env stops at the first physics step of the action that is done
+        running = np.ones(len(self.envs), dtype=bool)
+        dones = np.zeros(len(self.envs), dtype=bool)
+        self.rewards[:] = 0.
+        for k in range(self.envs[0].frame_skip):
+            for i in np.flatnonzero(running):
+                self.envs[i].advance(self.actions[i], first=k == 0)
+                self._snapshots[i] = self.envs[i].scenario.world.snapshot[0]
+            rewards, done = self._task.evaluate(self._snapshots)
+            self.rewards[running] += rewards[running]
+            dones |= running & done
+            running &= ~done
+            if not running.any():
+                break
+        self.dones[:] = dones
+        self.poses[:] = self._snapshots['pose']
+        self.dist_obj[:] = self._snapshots['dist_obj']
+        self.times[:] = self._snapshots['time']
+        for i, env in enumerate(self.envs):
+            obs = env.observation
+            if dones[i]:
+                # auto-reset: the observation returned is the first one of the next episode
+                self.terminal_obs[i] = obs
+                obs = env.reset()
+            self.obs[i] = obs
+        if dones.any():
+            self._task.reset(dones)
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            self.obs[i] = env.reset()
+        self._task.reset()
+        self.dones[:] = False
+
+    def seed(self, seed):
+        for env in self.envs:
+            env.seed(seed)
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+def _worker(conn, path, n_envs, env_kwargs, buffers, start):
+    views = [np.frombuffer(raw, dtype=np.float64).reshape(shape)[start:start+n_envs]
+             for raw, shape in buffers]
+    batch = _EnvBatch([make_env(path, **env_kwargs) for _ in range(n_envs)], views)
+    try:
+        while True:
+            command, args = conn.recv()
+            if command == 'close':
+                break
+            try:
+                getattr(batch, command)(*args)
+                conn.send(None)
+            except Exception as e:
+                # raised again by the main process
+                conn.send(e)
+    finally:
+        batch.close()
+        conn.send(None)
+        conn.close()
+
+
+class VectorNavEnv(gym.Env):
+    """N navigation simulations of the same scenario, stepped with a single step(actions[N,2]).
+
+    Each simulation is a SimpleNavEnv with its own scenario and physics client, their rewards and dones
+    being computed by one task for all of them (per process). With n_workers=0 they are all stepped in
+    this process, otherwise they are split between n_workers processes that
+    write the observations, rewards, dones and infos in shared memory buffers, only the commands
+    crossing the pipes.
+
+    A simulation that is done is reset at once (auto-reset): the observation returned for it is the
+    first one of its next episode, the last one of the finished episode is in infos['terminal_observation'].
+
+    Attributes:
+        n_envs: int, number of simulations.
+        n_workers: int, number of worker processes, 0 to step the simulations in-process.
+    """
+
+    def __init__(self, path, n_envs=1, n_workers=0, headless=True, frame_skip=1):
+        """
+        :param path: scenario file
+        :param n_envs: number of simulations
+        :param n_workers: number of worker processes, 0 for in-process simulations
+        :param headless: headless profile of the simulations (see SimpleNavScenario.set_headless)
+        :param frame_skip: physics steps per action (see SimpleNavEnv)
+        """
+        self.n_envs = n_envs
+        self.n_workers = min(n_workers, n_envs)
+        env_kwargs = {'headless': headless, 'frame_skip': frame_skip}
+        env = make_env(path, **env_kwargs)
+        rays = env.observation_space.shape[0]
+        self.observation_space = gym.spaces.Box(low=env.observation_space.low[0], high=env.observation_space.high[0],
+                                                shape=(n_envs, rays), dtype=np.float64)
+        self.action_space = gym.spaces.Box(low=-1.0, high=1.0, shape=(n_envs, 2), dtype=np.float64)
+
+        shapes = [(n_envs, rays), (n_envs,), (n_envs,), (n_envs, 2), (n_envs, 6), (n_envs,), (n_envs,),
+                  (n_envs, rays)]
+        if self.n_workers == 0:
+            buffers = [np.zeros(shape) for shape in shapes]
+            self._batch = _EnvBatch([env] + [make_env(path, **env_kwargs) for _ in range(n_envs - 1)],
+                                    buffers)
+        else:
+            env.close()
+            raw = [multiprocessing.RawArray('d', int(np.prod(shape))) for shape in shapes]
+            buffers = [np.frombuffer(r, dtype=np.float64).reshape(shape) for r, shape in zip(raw, shapes)]
+            self._conns = []
+            self._workers = []
+            start = 0
+            for n in map(len, np.array_split(np.arange(n_envs), self.n_workers)):
+                conn, worker_conn = multiprocessing.Pipe()
+                worker = multiprocessing.Process(
+                    target=_worker, args=(worker_conn, path, n, env_kwargs, list(zip(raw, shapes)), start),
+                    daemon=True)
+                worker.start()
+                worker_conn.close()
+                self._conns.append(conn)
+                self._workers.append(worker)
+                start += n
+        self._obs, self._rewards, self._dones, self._actions, self._poses, self._dist_obj, self._times, \
+            self._terminal_obs = buffers
+
+    def _call(self, command, args=None):
+        """Runs the _EnvBatch method in-process or in all the workers and waits for them.
+
+        :param args: list with the arguments of the method for each worker, none if None
+        """
+        if self.n_workers == 0:
+            getattr(self._batch, command)(*([] if args is None else args[0]))
+            return
+        for k, conn in enumerate(self._conns):
+            conn.send((command, () if args is None else args[k]))
+        errors = [conn.recv() for conn in self._conns]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def step(self, actions):
+        self._actions[:] = np.asarray(actions, dtype=np.float64).reshape(self.n_envs, 2)
+        self._call('step')
+        infos = {'pose': self._poses.copy(), 'dist_obj': self._dist_obj.copy(), 'time': self._times.copy(),
+                 'terminal_observation': self._terminal_obs.copy()}
+        return self._obs.copy(), self._rewards.copy(), self._dones.astype(bool), infos
+
+    def reset(self):
+        self._call('reset')
+        return self._obs.copy()
+
+    def seed(self, seed=None):
+        """Seeds the random generator of each process (worker k with seed+k)."""
+        n = max(self.n_workers, 1)
+        self._call('seed', [(None if seed is None else seed + k,) for k in range(n)])
+
+    def close(self):
+        if self.n_workers == 0:
+            self._batch.close()
+            return
+        for conn in self._conns:
+            conn.send(('close', ()))
+            conn.recv()
+        for worker in self._workers:
+            worker.join()
+        self._conns = []
+        self._workers = []
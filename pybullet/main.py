@@ -1,10 +1,10 @@
 import os
 import sys
 import time
-import csv
 import argparse
 import gym
 from iRobot_gym.envs import SimpleNavEnv
+from recorder import TrajectoryRecorder, export_csv
 from controllers.follow_wall import FollowWallController
 from controllers.forward import ForwardController
 from controllers.rulebased import RuleBasedController
@@ -12,105 +12,173 @@ from controllers.braitenberg import BraitenbergController
 from controllers.novelty_ctr import NoveltyController
 
 
+controllers = ("forward", "wall", "rule", "braitenberg", "novelty")
+
+
+def str2bool(value):
+    """Type of the boolean arguments: with type=bool, any non-empty string (even "False") is true."""
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise argparse.ArgumentTypeError("True or False expected, got '%s'" % value)
+
+
 class SimEnv():
     """This is the main class that runs the PyBullet simulation daccording to the arguments.
 
     Attributes:
-        _env: The actual environnment.
+        _args: the arguments of the run (see the parser of main.py).
+        _env: The actual environnment, None once closed.
         _sleep_time: float, representing the sleep time between each step.
         _ctr: string, the name of the controller.
         _verbose: bool, activate verbose or not.
+        _quiet: bool, no printing at all (batch runs).
         _i: int, iterator for steps.
-        _liste_position: list of tuples, values to save in the csv file.
+        _recorder: TrajectoryRecorder streaming the steps to the result file, None if not saved.
     """
 
-    def __init__(self):
-        self._env = gym.make(args.env+str('-v0'))
-        self._sleep_time = args.sleep_time
+    def __init__(self, args, result_file=None, quiet=False):
+        """
+        :param args: the arguments of the run (see the parser of main.py)
+        :param result_file: NPZ file of the trajectory if args.save_res, the first free one in results/<env> by default
+        :param quiet: no printing of the steps and of the results
+        """
+        self._args = args
+        self._quiet = quiet
+        self._env = gym.make(args.env+str('-v0'), headless=args.headless,
+                             frame_skip=args.frame_skip)
+        # no sleep in headless mode, a step only costs the physics and the raycast
+        self._sleep_time = 0 if args.headless else args.sleep_time
         self._ctr = args.ctr
         self._verbose = args.verbose
         self._i = 0
-        self._liste_position = []
-        self._env.reset()
-        self._obs, self._rew, self._done, self._info = self._env.step([0, 0])
-
-        # initialize controllers
-        if self._ctr == "forward":
-            self._controller = ForwardController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "wall":
-            self._controller = FollowWallController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "rule":
-            self._controller = RuleBasedController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "braitenberg":
-            self._controller = BraitenbergController(
-                self._env, verbose=self._verbose)
-        elif self._ctr == "novelty":
-            self._controller = NoveltyController(
-                self._env, args.file_name, verbose=self._verbose)
-        else:
-            print("\nNo controller named", self._ctr)
-            sys.exit()
+        self._recorder = None
+        # the environment is closed if the controller or the result file cannot be loaded
+        try:
+            self._env.reset()
+            self._obs, self._rew, self._done, self._info = self._env.step([0, 0])
+
+            # initialize controllers
+            if self._ctr == "forward":
+                self._controller = ForwardController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "wall":
+                self._controller = FollowWallController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "rule":
+                self._controller = RuleBasedController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "braitenberg":
+                self._controller = BraitenbergController(
+                    self._env, verbose=self._verbose)
+            elif self._ctr == "novelty":
+                self._controller = NoveltyController(
+                    self._env, args.file_name, verbose=self._verbose)
+            else:
+                print("\nNo controller named", self._ctr)
+                sys.exit()
+
+            # created once the controller is loaded, so that no empty file is left if it fails
+            if args.save_res:
+                if result_file is None:
+                    result_file = self._result_file(args.env, args.ctr)
+                self._recorder = TrajectoryRecorder(
+                    result_file, ["x", "y", "z", "roll", "pitch", "yaw", "distance_to_obj"], len(self._obs))
+        except BaseException:
+            self.close()
+            raise
 
     def _movement(self, action, nbr=1):
         for _ in range(nbr):
-            obs, rew, done, info = self._env.step(action)
+            # the last action only runs the steps left before max_steps
+            frames = self._args.frame_skip
+            if self._args.max_steps > 0:
+                frames = min(frames, self._args.max_steps - self._i)
+            # unwrapped: the gym wrappers only pass the action
+            obs, rew, done, info = self._env.unwrapped.step(action, frames)
             # print("Value of obs :" + str(obs))
             # print("Value of rew :" + str(rew))
             # print("Value of done :" + str(done))
             # print("Value of info :" + str(info))
-            print(self._i, end='\r')
-            self._i += 1
-            if args.save_res:
+            if not self._quiet:
+                print(self._i, end='\r')
+            # simulation steps actually run, fewer than frames if the episode is done
+            self._i += info['frames']
+            if self._recorder is not None:
                 x, y, z, roll, pitch, yaw = info['pose']
-                self._liste_position.append(
-                    [self._i, x, y, z, roll, pitch, yaw, info["dist_obj"], obs])
+                self._recorder.record(
+                    self._i, (x, y, z, roll, pitch, yaw, info["dist_obj"]), obs)
             if done:
                 break
 
-            time.sleep(self._sleep_time)
+            if self._sleep_time > 0:
+                time.sleep(self._sleep_time)
 
         return obs, rew, done, info
 
     def start(self):
         """Forward the simulation until its complete."""
-        while not self._done:
-            try:
-                command = self._controller.get_command()
-                self._obs, self._rew, self._done, self._info = self._movement(
-                    command)
-                self._controller.reset()
-
-            except KeyboardInterrupt:
-                print(' The simulation was forcibly stopped.')
-                break
-
-        print("Number of steps:", self._i)
-        print("Simulation time:", self._info['time'], "s\n")
-        self._env.close()
+        try:
+            while not self._done and (self._args.max_steps <= 0 or self._i < self._args.max_steps):
+                try:
+                    command = self._controller.get_command()
+                    self._obs, self._rew, self._done, self._info = self._movement(
+                        command)
+                    self._controller.reset()
+
+                except KeyboardInterrupt:
+                    print(' The simulation was forcibly stopped.')
+                    break
+        finally:
+            self.close()
+
+        if not self._quiet:
+            print("Number of steps:", self._i)
+            print("Simulation time:", self._info['time'], "s\n")
+
+    def close(self):
+        """Close the environment and write the steps recorded so far to the result file, at the end of
+        the run or after a failure (several calls are harmless)."""
+        if self._env is not None:
+            self._env.close()
+            self._env = None
+        if self._recorder is not None:
+            self._recorder.close()
+
+    def summary(self):
+        """Results of the run: number of steps, simulation time, end of the episode, last position and
+        distance to the goal, and trajectory file (None if not saved)."""
+        x, y = self._info['pose'][:2]
+        return {"steps": self._i, "time": self._info['time'], "done": bool(self._done), "x": x, "y": y,
+                "distance_to_obj": self._info["dist_obj"],
+                "result_file": self._recorder.filename if self._recorder is not None else None}
+
+    @staticmethod
+    def _result_file(env, ctr, taken=()):
+        """First free result file name in the folder corresponding to the controller, not in taken."""
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        path = f'{base_path}/../results/{env}/bullet_{ctr}_'
+        i = 1
+        while os.path.exists(path+str(i)+".npz") or os.path.exists(path+str(i)+".csv") or path+str(i)+".npz" in taken:
+            i += 1
+        return path+str(i)+".npz"
 
     def save_result(self):
-        """Save the simulation data in a csv file in the folder
-        corresponding to the controller and name it accordingly.
+        """Write the last steps of the simulation in the result file (streamed during the run),
+        and export it as a csv file if asked.
         """
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        path = f'{base_path}/../results/{args.env}/bullet_{args.ctr}_'
-        i = 1
-        if os.path.exists(path+str(i)+".csv"):
-            while os.path.exists(path+str(i)+".csv"):
-                i += 1
-        with open(path+str(i)+".csv", 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["steps", "x", "y", "z", "roll", "pitch", "yaw",
-                             "distance_to_obj", "laser"])
-            writer.writerows(self._liste_position)
-            print("\ndata saved in:", file.name)
+        self._recorder.close()
+        if not self._quiet:
+            print("\ndata saved in:", self._recorder.filename)
+        if self._args.save_csv:
+            csv_file = export_csv(self._recorder.filename)
+            if not self._quiet:
+                print("data exported in:", csv_file)
 
 
 def main():
-    sim_env = SimEnv()
+    sim_env = SimEnv(args)
     sim_env.start()
     if args.save_res:
         sim_env.save_result()
@@ -125,9 +193,17 @@ if __name__ == "__main__":
                         help='controller: wall, rule, braitenberg, novelty')
     parser.add_argument('--sleep_time', type=float, default=0.001,
                         help='sleeping time between each step')
-    parser.add_argument('--save_res', type=bool, default=False,
-                        help='save the result in a csv file: True or False')
-    parser.add_argument('--verbose', type=bool, default=False,
+    parser.add_argument('--frame_skip', type=int, default=1,
+                        help='number of simulation steps each command is applied for')
+    parser.add_argument('--max_steps', type=int, default=0,
+                        help='maximum number of simulation steps of the run, no limit if not positive')
+    parser.add_argument('--headless', action='store_true',
+                        help='DIRECT simulation without GUI, camera or ray drawing')
+    parser.add_argument('--save_res', type=str2bool, default=False,
+                        help='save the result in a npz file: True or False')
+    parser.add_argument('--save_csv', action='store_true',
+                        help='also export the result in the csv format of the previous versions')
+    parser.add_argument('--verbose', type=str2bool, default=False,
                         help='verbose for controller: True or False')
     parser.add_argument('--file_name', type=str,
                         default='NoveltyFitness/9/maze_nsfit9-gen38-p0', help='file name of the invidual to load if ctr=novelty')
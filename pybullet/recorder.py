@@ -0,0 +1,107 @@
+"""Streaming recorder of simulation trajectories.
+
+The steps are buffered in a fixed-size structured array (one float64 column per value, the laser
+ranges as a fixed-width column) and each full chunk is appended to an NPZ file as its own member,
+so that long runs are neither kept in memory nor lost if the simulation is interrupted. The file
+can be read back with load_trajectory (numpy only) or exported to the CSV format of the previous
+versions with export_csv, e.g. python recorder.py bullet_brait_1.npz
+"""
+
+import os
+import sys
+import csv
+import zipfile
+import numpy as np
+
+
+def trajectory_dtype(columns, n_lasers):
+    return np.dtype([("steps", np.int64)] + [(c, np.float64) for c in columns]
+                    + [("laser", np.float64, (n_lasers,))])
+
+
+class TrajectoryRecorder:
+    """Appends the steps of a run to an NPZ file, chunk_size steps at a time.
+
+    Attributes:
+        filename: str, NPZ file written.
+        dtype: structured dtype of the records: steps, the columns and laser.
+        _chunk: structured array, buffer of the steps not written yet.
+        _n: int, number of steps in the buffer.
+        _n_chunks: int, number of chunks written.
+    """
+
+    def __init__(self, filename, columns, n_lasers, chunk_size=1024, compress=True):
+        """
+        :param filename: NPZ file, overwritten
+        :param columns: names of the values recorded at each step, e.g. ["x", "y", "roll", "distance_to_obj"]
+        :param n_lasers: number of laser ranges recorded at each step
+        :param chunk_size: number of steps written at once
+        :param compress: deflate the chunks, as np.savez_compressed
+        """
+        self.filename = filename
+        self._compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self.dtype = trajectory_dtype(columns, n_lasers)
+        self._chunk = np.zeros(chunk_size, dtype=self.dtype)
+        self._n = 0
+        self._n_chunks = 0
+        # empty archive, the chunks are appended to it
+        zipfile.ZipFile(filename, "w").close()
+
+    def record(self, steps, values, laser):
+        """Adds a step: its number, the values of the columns and the laser ranges."""
+        self._chunk[self._n] = (steps, *values, laser)
+        self._n += 1
+        if self._n == len(self._chunk):
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered steps to the file."""
+        if self._n == 0:
+            return
+        # the archive is closed after each chunk, so that it is always readable
+        with zipfile.ZipFile(self.filename, "a", compression=self._compression) as archive:
+            with archive.open("chunk_%06d.npy" % self._n_chunks, "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, self._chunk[:self._n], allow_pickle=False)
+        self._n_chunks += 1
+        self._n = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_trajectory(filename):
+    """Structured array with all the steps recorded in a TrajectoryRecorder file."""
+    with np.load(filename, allow_pickle=False) as archive:
+        chunks = [archive[name] for name in sorted(archive.files)]
+    if not chunks:
+        raise RuntimeError("No step recorded in %s" % filename)
+    return np.concatenate(chunks)
+
+
+def export_csv(filename, csv_filename=None):
+    """Writes a TrajectoryRecorder file in the CSV format of the previous versions (the laser ranges as a list).
+
+    Returns:
+        The name of the CSV file, filename with the .csv extension by default.
+    """
+    if csv_filename is None:
+        csv_filename = os.path.splitext(filename)[0] + ".csv"
+    trajectory = load_trajectory(filename)
+    columns = [c for c in trajectory.dtype.names if c != "laser"]
+    with open(csv_filename, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(columns + ["laser"])
+        for record in trajectory:
+            writer.writerow([record[c] for c in columns] + [str(record["laser"].tolist())])
+    return csv_filename
+
+
+if __name__ == "__main__":
+    for f in sys.argv[1:]:
+        print("exported:", export_csv(f))
@@ -0,0 +1,155 @@
+"""Simulator-independent part of the headless batch runners fastsim/batch.py and pybullet/batch.py.
+
+A job is a dict with the env, the controller (ctr), the individual (file_name, for the novelty
+controller) and the NPZ file (result_file) of a run of the SimEnv of a simulator. The jobs are read
+from a CSV file with the columns env, ctr, file_name and optionally result_file, and/or are the
+individuals of directories of pickles, saved to results/individuals/<criteria>/<simulator>/<individual>.npz,
+the layout read by results/compare/batch_error.py. Each simulator only builds its SimEnv from a job.
+"""
+
+import os
+import csv
+import time
+import argparse
+import functools
+import multiprocessing
+
+individuals_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "individuals")
+
+
+def read_jobs(filename):
+    """Jobs of a CSV file with the columns env, ctr, file_name and optionally result_file."""
+    with open(filename, newline="") as file:
+        return [{"env": row["env"], "ctr": row["ctr"], "file_name": row.get("file_name") or "",
+                 "result_file": row.get("result_file") or None} for row in csv.DictReader(file)]
+
+
+def individual_jobs(directory, env, simulator):
+    """Jobs of the individuals (.pkl files) of a directory of results/individuals, saved in the
+    simulator ("FastSim" or "PyBullet") directory of their criteria."""
+    directory = os.path.relpath(os.path.abspath(directory), individuals_path)
+    criteria = directory.split(os.sep)[0]
+    jobs = []
+    for f in sorted(os.listdir(f'{individuals_path}/{directory}')):
+        name, ext = os.path.splitext(f)
+        if ext == ".pkl":
+            jobs.append({"env": env, "ctr": "novelty", "file_name": f'{directory}/{name}',
+                         "result_file": f'{individuals_path}/{criteria}/{simulator}/{name}.npz'})
+    return jobs
+
+
+def run_job(job, make_sim_env):
+    """Runs a job with the SimEnv returned by make_sim_env(job), which saves the trajectory without printing.
+
+    Returns:
+        The row of the results table, with the error message and without result file if the run failed.
+    """
+    row = dict(job, error="")
+    start = time.perf_counter()
+    sim_env = None
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(job["result_file"])), exist_ok=True)
+        sim_env = make_sim_env(job)
+        sim_env.start()
+        sim_env.save_result()
+        row.update(sim_env.summary())
+    except Exception as e:
+        row["error"] = "%s: %s" % (type(e).__name__, e)
+    finally:
+        # the simulation (e.g. a physics client in a pool worker) is not left open after a failure
+        if sim_env is not None:
+            sim_env.close()
+    if row["error"]:
+        # no complete trajectory to read
+        row["result_file"] = ""
+    row["wall_time"] = time.perf_counter() - start
+    return row
+
+
+def run_jobs(jobs, make_sim_env, envs, controllers, result_file, workers=None):
+    """Runs the jobs across a pool of workers (all the cores by default, in the current process if 0).
+
+    Args:
+        jobs: list of jobs, those without result_file being given the first free one.
+        make_sim_env: picklable function building the SimEnv of a job, see run_job.
+        envs, controllers: names of the envs and controllers of the simulator.
+        result_file: function (env, ctr, taken) returning the first free result file not in taken.
+        workers: number of processes.
+    Returns:
+        The rows of the results table, in the order of the jobs.
+    """
+    for job in jobs:
+        if job["env"] not in envs:
+            raise RuntimeError("Unknown env '%s'" % job["env"])
+        if job["ctr"] not in controllers:
+            raise RuntimeError("Unknown controller '%s'" % job["ctr"])
+    # the free result files are chosen here, as concurrent workers could choose the same ones
+    taken = set()
+    for job in jobs:
+        if job["result_file"] is None:
+            job["result_file"] = result_file(job["env"], job["ctr"], taken)
+            taken.add(job["result_file"])
+    run = functools.partial(run_job, make_sim_env=make_sim_env)
+    if workers == 0:
+        results = map(run, jobs)
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(run, jobs)
+    rows = []
+    for row in results:
+        rows.append(row)
+        print("[%d/%d] %s %s %s: %s" % (len(rows), len(jobs), row["env"], row["ctr"], row["file_name"],
+                                       row["error"] or "%d steps" % row["steps"]))
+    if workers != 0:
+        pool.close()
+        pool.join()
+    return rows
+
+
+def argument_parser(description, max_steps, max_steps_help, output):
+    """Parser of the options common to the batch runners, with the default max_steps and output of the simulator."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--jobs', type=str, default=None,
+                        help='CSV file of jobs with the columns env, ctr, file_name and optionally result_file')
+    parser.add_argument('--individuals', type=str, nargs='*', default=[],
+                        help='directories of individuals (.pkl) of results/individuals, run with the novelty controller')
+    parser.add_argument('--env', type=str, default="maze_hard",
+                        help='env of the individuals: kitchen, maze_hard or race_track')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of processes, all the cores by default, 0 to run in the current process')
+    parser.add_argument('--frame_skip', type=int, default=1,
+                        help='number of simulation steps each command is applied for')
+    parser.add_argument('--max_steps', type=int, default=max_steps,
+                        help=max_steps_help)
+    parser.add_argument('--save_csv', action='store_true',
+                        help='also export the trajectories in the csv format of the previous versions')
+    parser.add_argument('--output', type=str, default=output,
+                        help='CSV file of the results table')
+    return parser
+
+
+def run_batch(args, parser, simulator, columns, make_sim_env, envs, controllers, result_file):
+    """Runs the jobs of the parsed options of argument_parser and writes the results table.
+
+    Args:
+        simulator: "FastSim" or "PyBullet", directory of the trajectories of the individuals.
+        columns: columns of the results table.
+        make_sim_env, envs, controllers, result_file: see run_jobs.
+    """
+    jobs = []
+    if args.jobs is not None:
+        jobs += read_jobs(args.jobs)
+    for directory in args.individuals:
+        jobs += individual_jobs(directory, args.env, simulator)
+    if not jobs:
+        parser.error("no job: give --jobs and/or --individuals")
+
+    start = time.perf_counter()
+    rows = run_jobs(jobs, make_sim_env, envs, controllers, result_file, args.workers)
+    with open(args.output, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    n_errors = sum(1 for row in rows if row["error"])
+    print("%d jobs run in %.1f s (%d failed), results written to %s" %
+          (len(rows), time.perf_counter() - start, n_errors, args.output))
@@ -0,0 +1,91 @@
+"""Errors between the FastSim and PyBullet trajectories of all the individuals of one or more criteria.
+
+The trajectories with the same name in <individuals>/<criteria>/FastSim and <individuals>/<criteria>/PyBullet
+are compared (PyBullet being the ground truth) and the results are written to one CSV table, one row per
+pair: criteria, file_name, steps_fastsim, steps_bullet, mean_squared_error, dtw, frechet, final_error.
+The DTW and Fréchet alignments can be restricted to a Sakoe-Chiba band (--window) and the pairs can be
+compared by a pool of processes (--workers), e.g.
+
+    python results/compare/batch_error.py --criteria Fitness NoveltySearch NoveltyFitness --workers 4
+"""
+
+import os
+import sys
+import argparse
+import multiprocessing
+import pandas as pd
+
+base_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(base_path))
+from trajectories import load_trajectory, positions
+from metrics import mse, dtw, frechet, final_error
+
+individuals_path = os.path.join(os.path.dirname(base_path), "individuals")
+
+columns = ["criteria", "file_name", "steps_fastsim", "steps_bullet",
+           "mean_squared_error", "dtw", "frechet", "final_error"]
+
+
+def _names(directory):
+    if not os.path.isdir(directory):
+        return set()
+    return {os.path.splitext(f)[0] for f in os.listdir(directory) if f.endswith((".npz", ".csv"))}
+
+
+def find_pairs(path, criteria):
+    """Names of the trajectories saved by both simulators for a criteria, sorted."""
+    fastsim = _names(f'{path}/{criteria}/FastSim')
+    bullet = _names(f'{path}/{criteria}/PyBullet')
+    for name in sorted(fastsim ^ bullet):
+        print("Skipped %s/%s: not saved by both simulators" % (criteria, name))
+    return sorted(fastsim & bullet)
+
+
+def compare_pair(path, criteria, file_name, window=None):
+    """Row of the results table for a pair of trajectories."""
+    fastsim = positions(load_trajectory(f'{path}/{criteria}/FastSim/{file_name}'))
+    bullet = positions(load_trajectory(f'{path}/{criteria}/PyBullet/{file_name}'))
+    return [criteria, file_name, len(fastsim), len(bullet),
+            mse(bullet, fastsim), dtw(bullet, fastsim, window), frechet(bullet, fastsim, window),
+            final_error(bullet, fastsim)]
+
+
+def compare_all(criteria, path=individuals_path, workers=0, window=None):
+    """Results table (DataFrame) of all the pairs of the given criteria.
+
+    Args:
+        criteria: list of criteria, subdirectories of path.
+        path: directory of the individuals.
+        workers: number of processes comparing the pairs, in the current process if 0.
+        window: half-width in steps of the Sakoe-Chiba band of the DTW and Fréchet distances, None for no band.
+    """
+    tasks = [(path, c, name, window) for c in criteria for name in find_pairs(path, c)]
+    if workers > 0:
+        with multiprocessing.Pool(workers) as pool:
+            rows = pool.starmap(compare_pair, tasks, chunksize=1)
+    else:
+        rows = [compare_pair(*task) for task in tasks]
+    return pd.DataFrame(rows, columns=columns)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description='Compare the FastSim and PyBullet trajectories of the individuals.')
+    parser.add_argument('--criteria', type=str, nargs='+', default=["Fitness", "NoveltySearch", "NoveltyFitness"],
+                        help='choose among "Fitness", "NoveltySearch", "NoveltyFitness"')
+    parser.add_argument('--path', type=str, default=individuals_path,
+                        help='directory of the individuals')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of processes, 0 to compare the pairs in the current process')
+    parser.add_argument('--window', type=int, default=None,
+                        help='half-width in steps of the Sakoe-Chiba band of the DTW and Frechet distances, unconstrained by default')
+    parser.add_argument('--output', type=str, default=None,
+                        help='CSV file of the results, errors.csv in the directory of the individuals by default')
+
+    args = parser.parse_args()
+    output = args.output if args.output is not None else os.path.join(args.path, "errors.csv")
+    results = compare_all(args.criteria, args.path, args.workers, args.window)
+    results.to_csv(output, index=False)
+    print(results.groupby("criteria")[columns[4:]].mean())
+    print("Results of %d pairs written to %s" % (len(results), output))
@@ -1,33 +1,45 @@
 import os
+import sys
 import argparse
 import csv
-import pandas as pd
-from sklearn.metrics import mean_squared_error
 
 base_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(base_path))
+from trajectories import load_trajectory, positions
+from metrics import mse, dtw
 
+individuals_path = os.path.join(os.path.dirname(base_path), "individuals")
 
-def compute_error(criteria, file_name):
+
+def compute_error(criteria, file_name, metric="mean_squared_error", window=None):
     # assuming ListeResults is length 2 and bullet is the ground truth
     bullet_index = 0
     fastsim_index = (bullet_index + 1) % 2
-    path = f'{base_path}/results/individuals/{criteria}'
-    df1 = pd.read_csv(f'{path}/FastSim/{file_name}.csv')
-    df2 = pd.read_csv(f'{path}/PyBullet/{file_name}.csv')
+    path = f'{individuals_path}/{criteria}'
+    df1 = load_trajectory(f'{path}/FastSim/{file_name}')
+    df2 = load_trajectory(f'{path}/PyBullet/{file_name}')
     dfs = [df1, df2]
 
-    # if different number of steps
-    min_count = min([len(df.index) for df in dfs])
-
-    bullet = list(zip(dfs[bullet_index].x[:min_count],
-                      dfs[bullet_index].y[:min_count]))
-    fastsim = list(zip(dfs[fastsim_index].x[:min_count],
-                       dfs[fastsim_index].y[:min_count]))
-
-    with open(path+"/results.csv", 'a', encoding='UTF8') as file:
+    bullet = positions(dfs[bullet_index])
+    fastsim = positions(dfs[fastsim_index])
+    if metric == "mean_squared_error":
+        # on the steps of the shortest trajectory, same as sklearn's mean_squared_error averaged over x and y
+        error = mse(bullet, fastsim)
+        result_file = path + "/results.csv"
+    elif metric == "dtw":
+        # aligns the steps of the simulators, which do not run at the same rate
+        error = dtw(bullet, fastsim, window)
+        result_file = path + "/results_dtw.csv"
+    else:
+        raise RuntimeError("Unknown metric '%s'" % str(metric))
+
+    new_file = not os.path.exists(result_file)
+    with open(result_file, 'a', encoding='UTF8') as file:
         writer = csv.writer(file)
-        writer.writerow([mean_squared_error(bullet, fastsim)])
-    return mean_squared_error(bullet, fastsim)
+        if new_file:
+            writer.writerow([metric])
+        writer.writerow([error])
+    return error
 
 if __name__ == "__main__":
 
@@ -38,9 +50,13 @@ if __name__ == "__main__":
                         help='file_name')
     parser.add_argument('--criteria', type=str,
                         default='null', help='choose between "Fitness", "NoveltySearch", "NoveltyFitness"')
+    parser.add_argument('--metric', type=str, default="mean_squared_error",
+                        help='choose between "mean_squared_error" and "dtw"')
+    parser.add_argument('--window', type=int, default=None,
+                        help='half-width in steps of the Sakoe-Chiba band of the DTW, unconstrained by default')
 
 
     args = parser.parse_args()
     file_name = args.file_name
     criteria = args.criteria
-    print("Error between fastsim and bullet : ", compute_error(criteria, file_name))
\ No newline at end of file
+    print("Error between fastsim and bullet : ", compute_error(criteria, file_name, args.metric, args.window))
\ No newline at end of file
@@ -1,7 +1,2 @@
-for f in results/individuals/NoveltyFitness/selected/*; do
-    NAME=${f#results/individuals/}
-    echo ${NAME::-4}
-    python fastsim/main.py --display False --file_name ${NAME::-4} --criteria 'NoveltyFitness'
-    python pyBullet/main.py --file_name ${NAME::-4} --criteria 'NoveltyFitness'
-done
-
+python fastsim/batch.py --individuals results/individuals/NoveltyFitness/Selected
+python pybullet/batch.py --individuals results/individuals/NoveltyFitness/Selected
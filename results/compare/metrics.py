@@ -0,0 +1,143 @@
+"""Distances between two trajectories, given as (n, 2) and (m, 2) arrays of x/y positions."""
+
+import numpy as np
+
+
+def mse(a, b):
+    """Mean squared error of the positions at the same step, on the steps of the shortest trajectory
+    (as sklearn's mean_squared_error, averaged over x and y)."""
+    n = min(len(a), len(b))
+    return np.mean((a[:n] - b[:n])**2)
+
+
+def final_error(a, b):
+    """Distance between the last positions of the trajectories."""
+    return np.linalg.norm(a[-1] - b[-1])
+
+
+def _diagonal(n, m):
+    """Column of the diagonal of the n x m grid on each row."""
+    return np.rint(np.arange(n) * ((m - 1) / max(n - 1, 1))).astype(np.int64)
+
+
+def _band(n, m, window):
+    """First and last columns of each of the n rows in the Sakoe-Chiba band of half-width window around
+    the diagonal of the n x m grid (n >= m), the whole grid if window is None."""
+    if window is None or window >= m:
+        return np.zeros(n, dtype=np.int64), np.full(n, m - 1, dtype=np.int64)
+    center = _diagonal(n, m)
+    return np.maximum(center - window, 0), np.minimum(center + window, m - 1)
+
+
+def _running_extrema(x, size):
+    """Maxima and minima of the windows x[t:t+size] (of the columns of x), t in [0, len(x) - size],
+    computed in O(len(x)) with the prefix and suffix extrema of blocks of size elements."""
+    n_blocks = -(-len(x) // size)
+    padded = np.concatenate([x, np.repeat(x[-1:], n_blocks * size - len(x), axis=0)])
+    blocks = padded.reshape(n_blocks, size, -1)
+    end = len(x) - size + 1
+    extrema = []
+    for extremum in (np.maximum, np.minimum):
+        prefix = extremum.accumulate(blocks, axis=1).reshape(padded.shape)
+        suffix = extremum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+        # the window starting at t is the end of the block of t followed by the start of the next one
+        extrema.append(extremum(suffix[:end], prefix[size - 1:size - 1 + end]))
+    return extrema
+
+
+def _accumulate(a, b, frechet, window=None, max_distance=np.inf):
+    """Value of the DTW (or discrete Fréchet) recursion on the last cell of the n x m grid (n >= m),
+    restricted to the Sakoe-Chiba band of half-width window.
+
+    The cells of an anti-diagonal i+j=k only depend on the two previous anti-diagonals, so they are
+    computed at once with NumPy, each anti-diagonal being stored by row (index i+1) in one of three
+    rotating buffers, with infinite values around its rows so that the cells out of the grid (or of
+    the band) are never chosen. As every alignment crosses every anti-diagonal, the computation is
+    abandoned (returning inf) as soon as a whole anti-diagonal exceeds max_distance.
+    """
+    n, m = len(a), len(b)
+    lo, hi = _band(n, m, window)
+    # rows of the band on each anti-diagonal k: i + hi[i] >= k and i + lo[i] <= k, contiguous as
+    # i + lo[i] and i + hi[i] are increasing
+    diagonals = np.arange(n + m - 1)
+    starts = np.searchsorted(np.arange(n) + hi, diagonals)
+    ends = np.searchsorted(np.arange(n) + lo, diagonals, side='right') - 1
+    buffers = [np.full(n + 2, np.inf) for _ in range(3)]
+    # virtual cell (-1, -1), the predecessor of (0, 0)
+    buffers[(-2) % 3][0] = 0.
+    # positions as complex numbers and b reversed, so that the cells of an anti-diagonal are
+    # contiguous slices of both; the loop only writes to preallocated arrays
+    a_points = a[:, 0] + 1j * a[:, 1]
+    b_points = (b[:, 0] + 1j * b[:, 1])[::-1].copy()
+    delta = np.empty(n, dtype=np.complex128)
+    cost = np.empty(n)
+    for k in range(n + m - 1):
+        i0, i1 = starts[k], ends[k]
+        current, previous, previous2 = buffers[k % 3], buffers[(k - 1) % 3], buffers[(k - 2) % 3]
+        # distances between a[i] and b[k-i] for i in [i0, i1]
+        size = i1 - i0 + 1
+        j0 = m - 1 - k + i0
+        np.subtract(a_points[i0:i1 + 1], b_points[j0:j0 + size], out=delta[:size])
+        np.abs(delta[:size], out=cost[:size])
+        # best of the predecessors (i-1, j), (i, j-1) and (i-1, j-1)
+        values = current[i0 + 1:i1 + 2]
+        np.minimum(previous[i0:i1 + 1], previous[i0 + 1:i1 + 2], out=values)
+        np.minimum(values, previous2[i0:i1 + 1], out=values)
+        if frechet:
+            np.maximum(cost[:size], values, out=values)
+        else:
+            np.add(cost[:size], values, out=values)
+        current[i0] = np.inf
+        current[i1 + 2] = np.inf
+        if max_distance < np.inf and k % 64 == 0 and values.min() > max_distance:
+            return np.inf
+    distance = buffers[(n + m - 2) % 3][n]
+    return distance if distance <= max_distance else np.inf
+
+
+def _prepare(a, b):
+    """Float arrays of the trajectories, the longest first (the distances are symmetric)."""
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return (a, b) if len(a) >= len(b) else (b, a)
+
+
+def lb_keogh(a, b, window):
+    """LB_Keogh lower bound of dtw(a, b, window): sum over the steps of the longest trajectory of the
+    distance to the bounding box of the steps of the other one in its band, in O(n + m)."""
+    a, b = _prepare(a, b)
+    if window is None or window >= len(b):
+        upper, lower = np.broadcast_to(b.max(axis=0), a.shape), np.broadcast_to(b.min(axis=0), a.shape)
+    else:
+        # b padded with copies of its first and last steps: the band of row i is the window of the
+        # padded trajectory starting at the diagonal column of the row
+        padded = np.concatenate([np.repeat(b[:1], window, axis=0), b, np.repeat(b[-1:], window, axis=0)])
+        maxima, minima = _running_extrema(padded, 2 * window + 1)
+        center = _diagonal(len(a), len(b))
+        upper, lower = maxima[center], minima[center]
+    delta = np.maximum(a - upper, 0) + np.maximum(lower - a, 0)
+    return np.sqrt(delta[:, 0]**2 + delta[:, 1]**2).sum()
+
+
+def dtw(a, b, window=None, max_distance=np.inf):
+    """Dynamic time warping distance: minimal sum of the euclidean distances along a monotonic alignment
+    of the steps of the two trajectories.
+
+    Args:
+        a, b: (n, 2) and (m, 2) arrays of positions.
+        window: half-width (in steps of the shortest trajectory) of the Sakoe-Chiba band around the
+            diagonal in which the alignment is searched, unconstrained if None.
+        max_distance: inf is returned if the distance exceeds it, without computing the alignment
+            if the LB_Keogh bound already does, or as soon as an anti-diagonal does.
+    """
+    a, b = _prepare(a, b)
+    if max_distance < np.inf and lb_keogh(a, b, window) > max_distance:
+        return np.inf
+    return _accumulate(a, b, False, window, max_distance)
+
+
+def frechet(a, b, window=None):
+    """Discrete Fréchet distance: minimal, over the monotonic alignments of the steps of the two
+    trajectories (in the Sakoe-Chiba band of half-width window, see dtw), of the largest euclidean
+    distance between aligned positions."""
+    a, b = _prepare(a, b)
+    return _accumulate(a, b, True, window)
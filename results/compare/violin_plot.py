@@ -1,12 +1,34 @@
+import argparse
 import pandas
 import matplotlib.pyplot as plt
 import numpy as np
- 
-def plot_violin(res):
+
+labels = {"mean_squared_error": "Mean squarred error", "dtw": "Dynamic time warping distance",
+          "frechet": "Frechet distance", "final_error": "Final position error"}
+
+criteria = {"Fitness": "fitness", "NoveltySearch": "novelty", "NoveltyFitness": "fitness + novelty"}
+
+
+def load_results(metric, table=None):
+    """ Vectors of the given metric for each criteria
+
+    :param metric: "mean_squared_error" or "dtw" (results.csv and results_dtw.csv of error.py), or any column of the table
+    :param table: CSV table of batch_error.py, the files of error.py are read if None
+    """
+    if table is not None:
+        df = pandas.read_csv(table)
+        return {name: df[df["criteria"] == c][metric].array for c, name in criteria.items()}
+    result_file = "results.csv" if metric == "mean_squared_error" else f"results_{metric}.csv"
+    return {name: pandas.read_csv(f'results/individuals/{c}/{result_file}')[metric].array
+            for c, name in criteria.items()}
+
+
+def plot_violin(res, ylabel='Mean squarred error'):
     """ Makes a violin plot of the results provided in the argument
 
     Makes a violin plot of the results provided in the argument.
     :param res: dictionary of the results to plot. The key is the name and the data is a vector of performance values.
+    :param ylabel: name of the performance
     """
     fig,ax=plt.subplots(figsize=(5,5))
     data=[]
@@ -22,7 +44,7 @@ def plot_violin(res):
     ax.yaxis.grid(True)
     ax.set_xticks([y + 1 for y in range(len(data))])
     ax.set_xlabel('Optimization methods')
-    ax.set_ylabel('Mean squarred error')
+    ax.set_ylabel(ylabel)
 
     # add x-tick labels
     plt.setp(ax, xticks=[y + 1 for y in range(len(data))],
@@ -33,18 +55,14 @@ def plot_violin(res):
     
 
 if __name__ == "__main__":
-    
-    # Dataset
-    fitData = pandas.read_csv('results/individuals/Fitness/results.csv')
-    fitData = fitData["mean_squared_error"].array
-    
-    novData = pandas.read_csv('results/individuals/NoveltySearch/results.csv')
-    novData = novData["mean_squared_error"].array
-    
-    noveFitData = pandas.read_csv('results/individuals/NoveltyFitness/results.csv')
-    noveFitData = noveFitData["mean_squared_error"].array
-    
-    data = [fitData, novData, noveFitData]
-     
-    data = {"fitness":fitData,"novelty":novData, "fitness + novelty":noveFitData}
-    plot_violin(data)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(
+        description='Violin plot of the errors between fastsim and bullet.')
+    parser.add_argument('--metric', type=str, default="mean_squared_error",
+                        help='choose between "mean_squared_error" and "dtw" (and "frechet", "final_error" with --table)')
+    parser.add_argument('--table', type=str, default=None,
+                        help='results of batch_error.py, e.g. results/individuals/errors.csv')
+    args = parser.parse_args()
+
+    data = load_results(args.metric, args.table)
+    plot_violin(data, labels.get(args.metric, args.metric))
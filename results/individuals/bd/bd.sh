@@ -1,4 +1,4 @@
-yourfilenames=`ls *.log`
+yourfilenames=`ls *.log *.bdlog 2>/dev/null`
 for eachfile in $yourfilenames
 do
    python ~/Documents/GitHub/Prandroide/fastsim/controllers/novelty/maze_plot.py $eachfile
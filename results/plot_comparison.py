@@ -1,11 +1,10 @@
 import os
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 import argparse
-import csv
 
 from iRobot_gym.bullet.configs import ScenarioSpec
+from trajectories import load_trajectory
 
 
 def plot_position(name, ListeResults, startx, starty, goalx, goaly, goalsize, ratio):
@@ -24,9 +23,9 @@ def plot_position(name, ListeResults, startx, starty, goalx, goaly, goalsize, ra
 
     plt.imshow(np.flipud(img), origin='lower')
     for s in ListeResults:
-        df = pd.read_csv(f'{base_path}/{name}/{s}.csv')
-        x = df.x
-        y = df.y
+        trajectory = load_trajectory(f'{base_path}/{name}/{s}')
+        x = trajectory["x"]
+        y = trajectory["y"]
         plt.plot(x*nb_rapport, y*nb_rapport, label=s, alpha=0.5)
         plt.legend(loc='best')
         plt.axis('off')
@@ -35,12 +34,12 @@ def plot_position(name, ListeResults, startx, starty, goalx, goaly, goalsize, ra
 
 
 def plot_dist_to_target(name, ListeResults):
-    L_df = [pd.read_csv(
-        f'{base_path}/{name}/{s}.csv') for s in ListeResults]
-    L_x = [df.x for df in L_df]
-    L_y = [df.y for df in L_df]
-    L_s = [df.steps for df in L_df]
-    L_d = [df.distance_to_obj for df in L_df]
+    L_df = [load_trajectory(
+        f'{base_path}/{name}/{s}') for s in ListeResults]
+    L_x = [df["x"] for df in L_df]
+    L_y = [df["y"] for df in L_df]
+    L_s = [df["steps"] for df in L_df]
+    L_d = [df["distance_to_obj"] for df in L_df]
 
     plt.subplot(2, 2, 1)
     for i in range(len(ListeResults)):
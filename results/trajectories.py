@@ -0,0 +1,105 @@
+"""Access to the trajectories saved by the main.py scripts of both simulators.
+
+A trajectory is loaded as a structured NumPy array, one record per step with the columns of the
+file (steps, x, y, distance_to_obj...) and the laser ranges as a (n_lasers,) float column:
+
+    trajectory = load_trajectory("maze_hard/bullet_brait_1")
+    xy = positions(trajectory)
+    lasers = trajectory["laser"]
+
+The NPZ files of recorder.py are read directly by its load_trajectory (the recorder.py of both
+simulators being the same module, the fastsim one is imported). The CSV files are parsed once (the
+laser column being a stringified list) and converted to .npy files in a cache directory, loaded
+memory-mapped by the next calls; the loaded trajectories are also kept in memory by the process.
+"""
+
+import os
+import sys
+import hashlib
+import zipfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fastsim"))
+from recorder import load_trajectory as _read_npz
+
+cache_dir = os.path.expanduser("~/.cache/irobot_results")
+
+_loaded = {}
+
+
+def find_trajectory(name):
+    """File of a trajectory given with or without extension, the NPZ file being preferred to the CSV one."""
+    if os.path.splitext(name)[1] in (".npz", ".csv"):
+        return name
+    for ext in (".npz", ".csv"):
+        if os.path.exists(name + ext):
+            return name + ext
+    raise RuntimeError("No trajectory file %s.npz or %s.csv" % (name, name))
+
+
+def parse_lasers(column):
+    """(n_steps, n_lasers) array of a CSV laser column, each row being a list ("[1.0, 0.5]") or a
+    NumPy array ("[1.  0.5]") converted to a string."""
+    text = " ".join(column).replace("[", " ").replace("]", " ").replace(",", " ")
+    values = np.array(text.split(), dtype=np.float64)
+    if len(column) == 0 or len(values) % len(column) != 0:
+        raise RuntimeError("The laser column does not have the same number of rays at each step")
+    return values.reshape(len(column), -1)
+
+
+def _read_csv(filename):
+    df = pd.read_csv(filename)
+    columns = [c for c in df.columns if c != "laser"]
+    fields = [(c, np.int64 if c == "steps" else np.float64) for c in columns]
+    lasers = None
+    if "laser" in df.columns:
+        lasers = parse_lasers(df["laser"].astype(str).tolist())
+        fields.append(("laser", np.float64, (lasers.shape[1],)))
+    trajectory = np.zeros(len(df), dtype=fields)
+    for c in columns:
+        trajectory[c] = df[c].to_numpy()
+    if lasers is not None:
+        trajectory["laser"] = lasers
+    return trajectory
+
+
+def _cache_file(filename):
+    stat = os.stat(filename)
+    key = "%s:%d:%d" % (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    return os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".npy")
+
+
+def load_trajectory(name, use_cache=True):
+    """Structured array of the steps of a trajectory file (see the module documentation).
+
+    Args:
+        name: NPZ or CSV file, with or without extension.
+        use_cache: use (and fill) the in-memory and on-disk caches of the converted CSV files.
+    Returns:
+        A structured array, read-only if it is memory-mapped from the cache: copy it to modify it.
+    """
+    filename = find_trajectory(name)
+    if use_cache and filename in _loaded:
+        return _loaded[filename]
+    if filename.endswith(".npz") and zipfile.is_zipfile(filename):
+        trajectory = _read_npz(filename)
+    elif not use_cache:
+        trajectory = _read_csv(filename)
+    else:
+        cache_file = _cache_file(filename)
+        if not os.path.exists(cache_file):
+            os.makedirs(cache_dir, exist_ok=True)
+            # written under a temporary name, so that concurrent processes never read a partial file
+            tmp_file = "%s.%d.npy" % (cache_file[:-4], os.getpid())
+            np.save(tmp_file, _read_csv(filename), allow_pickle=False)
+            os.replace(tmp_file, cache_file)
+        trajectory = np.load(cache_file, mmap_mode="r", allow_pickle=False)
+    if use_cache:
+        _loaded[filename] = trajectory
+    return trajectory
+
+
+def positions(trajectory, columns=("x", "y")):
+    """(n_steps, len(columns)) float array of the given columns of a trajectory."""
+    return np.stack([trajectory[c] for c in columns], axis=1)